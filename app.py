@@ -1,15 +1,10 @@
 import os
 import pandas as pd
-import matplotlib
-import sqlite3
 import json
-
-matplotlib.use("Agg")  # Use non-interactive backend
-import matplotlib.pyplot as plt
-import seaborn as sns
 import numpy as np
 from flask import (
     Flask,
+    g,
     render_template,
     request,
     redirect,
@@ -17,21 +12,75 @@ from flask import (
     flash,
     send_file,
     jsonify,
+    has_request_context,
+    abort,
 )
 from werkzeug.utils import secure_filename
-from transformers.pipelines import pipeline
+from inference import (
+    load_pipeline,
+    new_window_stats,
+    predict_batched,
+    score_columns,
+    ShardedPredictor,
+    window_overhead,
+)
+from model_registry import DEFAULT_MODEL_KEY, PipelineCache, load_registry
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsRegistry
+from timing import StageTimer
+from profiling import (
+    profile_path,
+    profiling_requested,
+    report_path,
+    run_profiled,
+    save_profile,
+)
+from flags import parse_flag
+from prediction_cache import PredictionCache, cache_revision
+from jobs import JobManager, COMPLETED, FAILED
+from result_store import ResultStore, is_valid_key
+from database import Database
+from sentiment_stats import (
+    column_arrays,
+    compute_frame_stats,
+    compute_stats,
+    concat_arrays,
+    sentiment_columns,
+)
+from row_store import (
+    RunRowsWriter,
+    load_prior_predictions,
+    read_run_rows,
+    row_hashes,
+    rows_available,
+    run_rows_path,
+    run_text_columns,
+)
+from excel_io import (
+    build_columnar_cache,
+    estimate_row_count,
+    iter_excel_chunks,
+    prefetch,
+    read_excel_columns,
+    read_header,
+    read_preview,
+    write_results_workbook,
+)
 import logging
 import io
+import re
 import base64
+import binascii
+import shutil
+import threading
+import time
 from datetime import datetime
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import warnings
 
 warnings.filterwarnings("ignore")
 
-# Configure matplotlib and seaborn
-plt.style.use("default")
-sns.set_palette("husl")
-
 app = Flask(__name__)
 app.secret_key = "sentiment_analysis_app_2024"
 app.config["MAX_CONTENT_LENGTH"] = 16 * 1024 * 1024  # 16MB max file size
@@ -39,113 +88,348 @@ app.config["MAX_CONTENT_LENGTH"] = 16 * 1024 * 1024  # 16MB max file size
 # Configure upload folder
 UPLOAD_FOLDER = "uploads"
 RESULTS_FOLDER = "results"
+CHART_FOLDER = os.path.join(RESULTS_FOLDER, "charts")
+RUN_ROWS_FOLDER = os.path.join(RESULTS_FOLDER, "runs")  # row-level output per run
+PROFILE_FOLDER = os.path.join(RESULTS_FOLDER, "profiles")  # opt-in cProfile output
 DATABASE_FILE = "sentiment_analysis.db"
+PREDICTION_CACHE_FILE = os.path.join(
+    os.path.dirname(DATABASE_FILE), "prediction_cache.db"
+)
+
+# Models an analysis can choose from; more can be listed in a JSON registry
+# file. SENTIMENT_MODEL_REVISION pins the revision of the default model.
+MODEL_REGISTRY = load_registry(
+    os.environ.get("SENTIMENT_MODEL_REGISTRY"),
+    default_revision=os.environ.get("SENTIMENT_MODEL_REVISION", "main"),
+)
+DEFAULT_MODEL = os.environ.get("SENTIMENT_MODEL", DEFAULT_MODEL_KEY)
+
+# Memory budget for loaded pipelines; least recently used models are unloaded
+MODEL_CACHE_BYTES = int(os.environ.get("SENTIMENT_MODEL_CACHE_MB", "2048")) * 2**20
+
+# Profile every analysis with cProfile (single runs opt in with ?profile=1)
+PROFILE_ALL_RUNS = profiling_requested(os.environ.get("SENTIMENT_PROFILE"))
+
+# Reuse labels of unchanged rows from the previous run of the same survey
+# (single runs opt in or out with ?incremental=1 / 0)
+INCREMENTAL_BY_DEFAULT = os.environ.get("SENTIMENT_INCREMENTAL", "0")
+
+# Inference backend: "pytorch" (transformers, fp32) or "onnx-int8"
+# (quantized ONNX Runtime, CPU only; requires the onnx extras)
+SENTIMENT_BACKEND = os.environ.get("SENTIMENT_BACKEND", "pytorch")
 
-for folder in [UPLOAD_FOLDER, RESULTS_FOLDER]:
+for folder in [
+    UPLOAD_FOLDER,
+    RESULTS_FOLDER,
+    CHART_FOLDER,
+    RUN_ROWS_FOLDER,
+    PROFILE_FOLDER,
+]:
     if not os.path.exists(folder):
         os.makedirs(folder)
 
 app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
 app.config["RESULTS_FOLDER"] = RESULTS_FOLDER
+app.config["CHART_FOLDER"] = CHART_FOLDER
+
+# Number of responses sent to the model per forward pass
+INFERENCE_BATCH_SIZE = int(os.environ.get("SENTIMENT_BATCH_SIZE", "32"))
+
+# Worker processes used for inference; 1 keeps inference in this process
+INFERENCE_WORKERS = int(os.environ.get("SENTIMENT_INFERENCE_WORKERS", "1"))
+
+# Charts are rendered once per run at screen resolution and cached by browsers
+CHART_NAMES = ("sentiment_distribution", "sentiment_pie", "confidence_analysis")
+CHART_DPI = 110
+CHART_MAX_AGE = 24 * 60 * 60
+
+# "server" renders PNG charts with matplotlib; "client" sends only the JSON
+# aggregates and lets the browser draw them (override per page with ?charts=)
+CHART_RENDERING = os.environ.get("SENTIMENT_CHART_RENDERING", "server")
+
+# Memory budget for finished results kept for /results and /download
+RESULT_STORE_BYTES = int(os.environ.get("SENTIMENT_RESULT_STORE_MB", "256")) * 2**20
+# Earlier versions spilled whole results, response text included, here
+LEGACY_SPILL_FOLDER = os.path.join(RESULTS_FOLDER, "spill")
+
+# Most rows returned by one /api/runs/<id>/rows request
+RUN_ROWS_MAX_LIMIT = 1000
+
+# Runs per history page (the JSON API accepts up to the maximum via ?limit=)
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 500
+
+# Model loading stages reported by /api/status, with their share of the work
+MODEL_LOAD_PROGRESS = {
+    "starting": 0.05,
+    "loading model": 0.1,
+    "model loaded": 0.8,
+    "warming up": 0.8,
+    "ready": 1.0,
+}
+# Dummy batch run once after loading so the first real batch starts hot
+WARMUP_TEXTS = [
+    "The course was great.",
+    "I did not enjoy the assignments at all, they felt disconnected from the lectures.",
+]
+
+# Rows shown on the preview page and number of uploads whose preview is cached
+PREVIEW_ROWS = 10
+PREVIEW_CACHE_SIZE = 32
+
+# Number of analyses that may run concurrently in the background
+ANALYSIS_WORKERS = int(os.environ.get("SENTIMENT_ANALYSIS_WORKERS", "2"))
 
 # Global variables
-sentiment_pipeline = None
-analysis_results = {}
+pipeline_cache = PipelineCache(load_pipeline, max_bytes=MODEL_CACHE_BYTES)
+prediction_caches = {}  # ModelSpec -> PredictionCache
+sharded_predictor = None
+model_lock = threading.Lock()
+model_status_lock = threading.Lock()
+model_status = {
+    "state": "idle",
+    "stage": "not loaded",
+    "progress": 0.0,
+    "error": None,
+    "started_at": None,
+    "finished_at": None,
+}
+db = Database(DATABASE_FILE)
+job_manager = JobManager(
+    max_workers=ANALYSIS_WORKERS, on_finish=lambda job: record_job_metrics(job)
+)
+result_store = ResultStore(max_bytes=RESULT_STORE_BYTES)
+shutil.rmtree(LEGACY_SPILL_FOLDER, ignore_errors=True)
+export_lock = threading.Lock()
+ingest_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest")
+
+# Process-wide metrics, served in Prometheus text format at /api/metrics
+metrics = MetricsRegistry()
+analyses_total = metrics.counter(
+    "sentiment_analyses_total", "Finished analyses by outcome", ["state"]
+)
+rows_analyzed_total = metrics.counter(
+    "sentiment_rows_analyzed_total", "Rows scored by completed analyses"
+)
+analysis_seconds = metrics.histogram(
+    "sentiment_analysis_duration_seconds", "Wall-clock time of finished analyses"
+)
+stage_seconds = metrics.histogram(
+    "sentiment_stage_duration_seconds", "Time spent in each analysis stage", ["stage"]
+)
+analysis_rows_per_second = metrics.histogram(
+    "sentiment_analysis_rows_per_second",
+    "Throughput of completed analyses",
+    buckets=(10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000),
+)
+http_requests_total = metrics.counter(
+    "sentiment_http_requests_total",
+    "HTTP requests by endpoint, method and status",
+    ["endpoint", "method", "status"],
+)
+http_request_seconds = metrics.histogram(
+    "sentiment_http_request_duration_seconds",
+    "HTTP request latency by endpoint",
+    ["endpoint"],
+)
+metrics.gauge(
+    "sentiment_jobs",
+    "Tracked analysis jobs by state",
+    ["state"],
+    callback=lambda: {(k,): v for k, v in job_manager.state_counts().items()},
+)
+metrics.gauge(
+    "sentiment_model_pipelines_loaded",
+    "Model pipelines held in memory",
+    callback=lambda: pipeline_cache.stats()["loaded"],
+)
+metrics.gauge(
+    "sentiment_model_pipeline_bytes",
+    "Estimated memory held by loaded model pipelines",
+    callback=lambda: pipeline_cache.stats()["bytes"],
+)
+metrics.gauge(
+    "sentiment_result_store_bytes",
+    "Estimated memory held by finished results",
+    callback=lambda: result_store.stats().get("bytes"),
+)
 
 
 def init_database():
     """Initialize the SQLite database for storing analysis history"""
-    conn = sqlite3.connect(DATABASE_FILE)
-    cursor = conn.cursor()
-
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS analysis_runs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            original_filename TEXT NOT NULL,
-            result_filename TEXT NOT NULL,
-            upload_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            total_responses INTEGER,
-            sentiment_distribution TEXT,  -- JSON string
-            confidence_stats TEXT,       -- JSON string
-            avg_confidence REAL,
-            most_common_sentiment TEXT,
-            most_common_percentage REAL,
-            high_confidence_count INTEGER,
-            high_confidence_percentage REAL,
-            processing_time REAL
-        )
+    version = db.migrate()
+    logging.info(f"Database schema at version {version}")
+
+
+def save_analysis_to_db(
+    original_filename,
+    result_filename,
+    insights,
+    processing_time,
+    chart_aggregates=None,
+    model_id=None,
+    model_revision=None,
+    stage_timings=None,
+    rows_per_second=None,
+    survey=None,
+):
+    """Save analysis results to the database
+
+    ``survey`` holds the survey_name, column_analyzed, text_columns,
+    key_columns, base_run_id and rows_reused that let later uploads of the
+    same survey run incrementally.
     """
-    )
-
-    conn.commit()
-    conn.close()
-
-
-def save_analysis_to_db(original_filename, result_filename, insights, processing_time):
-    """Save analysis results to the database"""
+    survey = survey or {}
     try:
-        conn = sqlite3.connect(DATABASE_FILE)
-        cursor = conn.cursor()
+        conn = db.connection()
 
         # Prepare data for insertion
         sentiment_dist = json.dumps(insights.get("sentiment_distribution", {}))
         confidence_stats = json.dumps(insights.get("confidence_stats", {}))
 
-        cursor.execute(
-            """
+        with conn:
+            cursor = conn.execute(
+                """
             INSERT INTO analysis_runs (
                 original_filename, result_filename, total_responses,
                 sentiment_distribution, confidence_stats, avg_confidence,
                 most_common_sentiment, most_common_percentage,
                 high_confidence_count, high_confidence_percentage,
-                processing_time
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                processing_time, chart_aggregates, model_id, model_revision,
+                stage_timings, rows_per_second, survey_name, column_analyzed,
+                key_columns, base_run_id, rows_reused, text_columns,
+                column_insights
+            ) VALUES (
+                ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?
+            )
         """,
-            (
-                original_filename,
-                result_filename,
-                insights.get("total_responses", 0),
-                sentiment_dist,
-                confidence_stats,
-                insights.get("confidence_stats", {}).get("mean", 0.0),
-                insights.get("most_common_sentiment", {}).get("sentiment", "Unknown"),
-                insights.get("most_common_sentiment", {}).get("percentage", 0.0),
-                insights.get("high_confidence", {}).get("count", 0),
-                insights.get("high_confidence", {}).get("percentage", 0.0),
-                processing_time,
-            ),
-        )
-
-        conn.commit()
-        run_id = cursor.lastrowid
-        conn.close()
-        return run_id
+                (
+                    original_filename,
+                    result_filename,
+                    insights.get("total_responses", 0),
+                    sentiment_dist,
+                    confidence_stats,
+                    insights.get("confidence_stats", {}).get("mean", 0.0),
+                    insights.get("most_common_sentiment", {}).get(
+                        "sentiment", "Unknown"
+                    ),
+                    insights.get("most_common_sentiment", {}).get("percentage", 0.0),
+                    insights.get("high_confidence", {}).get("count", 0),
+                    insights.get("high_confidence", {}).get("percentage", 0.0),
+                    processing_time,
+                    json.dumps(chart_aggregates) if chart_aggregates else None,
+                    model_id,
+                    model_revision,
+                    json.dumps(stage_timings) if stage_timings else None,
+                    rows_per_second,
+                    survey.get("survey_name"),
+                    survey.get("column_analyzed"),
+                    json.dumps(survey.get("key_columns") or []),
+                    survey.get("base_run_id"),
+                    survey.get("rows_reused"),
+                    json.dumps(survey.get("text_columns") or []),
+                    json.dumps(insights.get("per_column") or {}),
+                ),
+            )
+        return cursor.lastrowid
 
     except Exception as e:
         logging.error(f"Error saving to database: {e}")
         return None
 
 
-def get_analysis_history():
-    """Retrieve all analysis runs from the database"""
+def encode_history_cursor(upload_date, run_id):
+    """Encode the position after a history row as an opaque cursor string"""
+    raw = json.dumps([upload_date, run_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_history_cursor(cursor):
+    """Decode a history cursor into (upload_date, run_id); raises ValueError"""
     try:
-        conn = sqlite3.connect(DATABASE_FILE)
-        cursor = conn.cursor()
+        upload_date, run_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(upload_date), int(run_id)
+    except (TypeError, ValueError, binascii.Error) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
 
-        cursor.execute(
-            """
+
+def parse_history_filters(args):
+    """Read filename/date-range filters and the page cursor from request args
+
+    Returns ``(filters, error)``; dates are ``YYYY-MM-DD`` and both ends of the
+    range are inclusive.
+    """
+    filters = {
+        "filename": args.get("filename", "").strip(),
+        "date_from": args.get("date_from", "").strip(),
+        "date_to": args.get("date_to", "").strip(),
+        "cursor": args.get("cursor", "").strip(),
+    }
+    for key in ("date_from", "date_to"):
+        try:
+            if filters[key]:
+                datetime.strptime(filters[key], "%Y-%m-%d")
+        except ValueError:
+            return filters, f"Invalid date '{filters[key]}', expected YYYY-MM-DD"
+    try:
+        if filters["cursor"]:
+            decode_history_cursor(filters["cursor"])
+    except ValueError as e:
+        return filters, str(e)
+    return filters, None
+
+
+def get_analysis_history(
+    filename="", date_from="", date_to="", cursor="", limit=HISTORY_PAGE_SIZE
+):
+    """Retrieve one page of analysis runs, newest first
+
+    Pages are addressed by keyset cursor on (upload_date, id), so each page
+    costs the same however many runs are stored. Returns ``(runs,
+    next_cursor)``; ``next_cursor`` is None on the last page.
+    """
+    conditions = []
+    params = []
+    if filename:
+        conditions.append("original_filename LIKE ? ESCAPE '\\'")
+        escaped = re.sub(r"([\\%_])", r"\\\1", filename)
+        params.append(f"%{escaped}%")
+    if date_from:
+        conditions.append("upload_date >= ?")
+        params.append(date_from)
+    if date_to:
+        conditions.append("upload_date < date(?, '+1 day')")
+        params.append(date_to)
+    if cursor:
+        conditions.append("(upload_date, id) < (?, ?)")
+        params.extend(decode_history_cursor(cursor))
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    try:
+        result = db.connection().execute(
+            f"""
             SELECT id, original_filename, upload_date, total_responses,
-                   sentiment_distribution, most_common_sentiment, 
+                   sentiment_distribution, most_common_sentiment,
                    most_common_percentage, avg_confidence,
-                   high_confidence_percentage, processing_time
-            FROM analysis_runs 
-            ORDER BY upload_date DESC
-        """
+                   high_confidence_percentage, processing_time, model_id,
+                   rows_per_second
+            FROM analysis_runs
+            {where}
+            ORDER BY upload_date DESC, id DESC
+            LIMIT ?
+        """,
+            (*params, limit + 1),
         )
 
+        # One extra row tells whether another page follows
+        rows = result.fetchall()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_history_cursor(rows[-1][2], rows[-1][0])
+
         runs = []
-        for row in cursor.fetchall():
+        for row in rows:
             run_data = {
                 "id": row[0],
                 "original_filename": row[1],
@@ -157,33 +441,32 @@ def get_analysis_history():
                 "avg_confidence": row[7],
                 "high_confidence_percentage": row[8],
                 "processing_time": row[9],
+                "rows_per_second": row[11] or compute_throughput(row[3], row[9]),
+                "model_id": row[10],
             }
             runs.append(run_data)
 
-        conn.close()
-        return runs
+        return runs, next_cursor
 
     except Exception as e:
         logging.error(f"Error retrieving analysis history: {e}")
-        return []
+        return [], None
 
 
 def get_analysis_by_id(run_id):
     """Retrieve a specific analysis run by ID"""
     try:
-        conn = sqlite3.connect(DATABASE_FILE)
-        cursor = conn.cursor()
-
-        cursor.execute(
-            """
+        row = (
+            db.connection()
+            .execute(
+                """
             SELECT * FROM analysis_runs WHERE id = ?
         """,
-            (run_id,),
+                (run_id,),
+            )
+            .fetchone()
         )
 
-        row = cursor.fetchone()
-        conn.close()
-
         if row:
             return {
                 "id": row[0],
@@ -199,6 +482,18 @@ def get_analysis_by_id(run_id):
                 "high_confidence_count": row[10],
                 "high_confidence_percentage": row[11],
                 "processing_time": row[12],
+                "rows_per_second": row[17] or compute_throughput(row[4], row[12]),
+                "chart_aggregates": json.loads(row[13]) if row[13] else None,
+                "model_id": row[14],
+                "model_revision": row[15],
+                "stage_timings": json.loads(row[16]) if row[16] else {},
+                "survey_name": row[18],
+                "column_analyzed": row[19],
+                "key_columns": json.loads(row[20]) if row[20] else [],
+                "base_run_id": row[21],
+                "rows_reused": row[22],
+                "text_columns": json.loads(row[23]) if row[23] else [],
+                "column_insights": json.loads(row[24]) if row[24] else None,
             }
         return None
 
@@ -206,98 +501,297 @@ def get_analysis_by_id(run_id):
         logging.error(f"Error retrieving analysis by ID: {e}")
 
 
+def save_chart_aggregates(run_id, aggregates):
+    """Store chart aggregates for a run saved before they were recorded"""
+    try:
+        with db.connection() as conn:
+            conn.execute(
+                "UPDATE analysis_runs SET chart_aggregates = ? WHERE id = ?",
+                (json.dumps(aggregates), run_id),
+            )
+    except Exception as e:
+        logging.error(f"Error saving chart aggregates: {e}")
+
+
+def save_column_insights(run_id, insights):
+    """Store per-column insights for a run saved before they were recorded"""
+    try:
+        with db.connection() as conn:
+            conn.execute(
+                "UPDATE analysis_runs SET column_insights = ? WHERE id = ?",
+                (json.dumps(insights), run_id),
+            )
+    except Exception as e:
+        logging.error(f"Error saving column insights: {e}")
+
+
+def survey_name_for(filename):
+    """Survey an upload belongs to: its original name without the upload timestamp"""
+    return re.sub(r"^\d{8}_\d{6}_", "", filename)
+
+
+def find_previous_run(survey_name, text_columns, key_columns, model_id, model_revision):
+    """Most recent run of the same survey, text columns, keys and model whose
+    row file still exists; returns its id or None"""
+    try:
+        result = db.connection().execute(
+            """
+            SELECT id FROM analysis_runs
+            WHERE survey_name = ? AND text_columns = ? AND key_columns = ?
+              AND model_id = ? AND model_revision = ?
+            ORDER BY id DESC
+            LIMIT 10
+        """,
+            (
+                survey_name,
+                json.dumps(text_columns),
+                json.dumps(key_columns or []),
+                model_id,
+                model_revision,
+            ),
+        )
+        for (run_id,) in result:
+            if os.path.exists(run_rows_path(RUN_ROWS_FOLDER, run_id)):
+                return run_id
+    except Exception as e:
+        logging.error(f"Error finding previous run: {e}")
+    return None
+
+
+def save_stage_timings(run_id, stage_timings):
+    """Store the final per-stage durations of a run, including post-save stages"""
+    try:
+        with db.connection() as conn:
+            conn.execute(
+                "UPDATE analysis_runs SET stage_timings = ? WHERE id = ?",
+                (json.dumps(stage_timings), run_id),
+            )
+    except Exception as e:
+        logging.error(f"Error saving stage timings: {e}")
+
+
+def record_stage_metrics(timer):
+    """Add a run's stage durations to the process-wide histograms"""
+    for stage, seconds in timer.stages.items():
+        stage_seconds.observe(seconds, stage=stage)
+
+
+def record_job_metrics(job):
+    """Count a finished analysis job and observe its duration and throughput"""
+    analyses_total.inc(state=job.state)
+    if job.started_at is not None and job.finished_at is not None:
+        analysis_seconds.observe(job.finished_at - job.started_at)
+    if job.state == COMPLETED:
+        rows_analyzed_total.inc(job.rows_total)
+        rate = job.rows_per_second()
+        if rate:
+            analysis_rows_per_second.observe(rate)
+
+
+def compute_throughput(row_count, seconds):
+    """Return rows processed per second, or 0.0 when no time was recorded"""
+    if not row_count or not seconds:
+        return 0.0
+    return round(row_count / seconds, 1)
+
+
 def allowed_file(filename):
     """Check if file extension is allowed"""
     return "." in filename and filename.rsplit(".", 1)[1].lower() in {"xlsx", "xls"}
 
 
-def load_sentiment_model():
-    """Load the sentiment analysis model"""
-    global sentiment_pipeline
+def set_model_status(state, stage, error=None):
+    """Record model loading progress for /api/status"""
+    with model_status_lock:
+        if model_status["started_at"] is None:
+            model_status["started_at"] = time.time()
+        model_status.update(state=state, stage=stage, error=error)
+        model_status["progress"] = MODEL_LOAD_PROGRESS.get(stage, 0.0)
+        if state in ("ready", "failed"):
+            model_status["finished_at"] = time.time()
+
+
+def get_model_status():
+    """JSON-serializable snapshot of model loading progress"""
+    with model_status_lock:
+        status = dict(model_status)
+    started_at = status.pop("started_at")
+    finished_at = status.pop("finished_at")
+    status["elapsed_seconds"] = (
+        round((finished_at or time.time()) - started_at, 2) if started_at else 0.0
+    )
+    return status
+
+
+def get_model_spec(model_key=None):
+    """Return the registry entry of a model key (the default when empty), or None"""
+    return MODEL_REGISTRY.get(model_key or DEFAULT_MODEL)
+
+
+def load_sentiment_model(model_key=None):
+    """Load a registered sentiment model
+
+    Returns ``(pipeline, prediction_cache)``, or ``(None, None)`` when the
+    model cannot be loaded. Pipelines are kept in a memory-bounded LRU, so
+    switching between a few models does not reload them each time.
+    """
+    spec = get_model_spec(model_key)
+    if spec is None:
+        logging.error(f"Unknown sentiment model: {model_key}")
+        return None, None
+    # /api/status tracks the default model, which is loaded at startup
+    is_default = spec.key == DEFAULT_MODEL
     try:
-        if sentiment_pipeline is None:
-            logging.info("Loading sentiment analysis model...")
-            sentiment_pipeline = pipeline(
-                "sentiment-analysis",
-                model="cardiffnlp/twitter-roberta-base-sentiment-latest",
-            )
-            logging.info("Model loaded successfully!")
+        # Background jobs may request a model concurrently; load it only once
+        with model_lock:
+            if is_default and pipeline_cache.peek(spec, SENTIMENT_BACKEND) is None:
+                set_model_status("loading", "loading model")
+            pipe = pipeline_cache.get(spec, SENTIMENT_BACKEND)
+            cache = prediction_caches.get(spec)
+            if cache is None:
+                revision = cache_revision(
+                    spec.model_id, spec.revision, SENTIMENT_BACKEND, pipe
+                )
+                cache = PredictionCache(PREDICTION_CACHE_FILE, spec.model_id, revision)
+                prediction_caches[spec] = cache
+            if is_default and model_status["state"] != "ready":
+                set_model_status("loaded", "model loaded")
+        return pipe, cache
+    except Exception as e:
+        logging.error(f"Error loading model {spec.model_id}: {e}")
+        if is_default:
+            set_model_status("failed", "failed", str(e))
+        return None, None
+
+
+def warm_up_model():
+    """Load the default model and run a dummy batch so the first analysis starts hot"""
+    pipe, _cache = load_sentiment_model()
+    if pipe is None:
+        return False
+    try:
+        set_model_status("loading", "warming up")
+        predict_batched(pipe, WARMUP_TEXTS, INFERENCE_BATCH_SIZE)
+        if CHART_RENDERING == "server":
+            get_pyplot()
+        set_model_status("ready", "ready")
+        logging.info("Model warmed up and ready")
         return True
     except Exception as e:
-        logging.error(f"Error loading model: {e}")
+        logging.error(f"Error warming up model: {e}")
+        set_model_status("failed", "failed", str(e))
         return False
 
 
-def analyze_sentiment(df, column_name="Why satisfied text area"):
-    """Perform sentiment analysis on the specified column of the dataframe"""
-    global sentiment_pipeline
+def start_model_warmup():
+    """Load and warm up the model on a background thread; returns the thread"""
+    set_model_status("loading", "starting")
+    thread = threading.Thread(target=warm_up_model, name="model-warmup", daemon=True)
+    thread.start()
+    return thread
+
 
+def get_sharded_predictor(model_key=None):
+    """Return the shared multi-process predictor when parallel mode is enabled
+
+    Worker processes hold the default model only; other models are scored
+    in-process so the pool is never torn down under a running job.
+    """
+    global sharded_predictor
+    spec = get_model_spec(model_key)
+    if INFERENCE_WORKERS <= 1 or spec is None or spec.key != DEFAULT_MODEL:
+        return None
+    with model_lock:
+        if sharded_predictor is None:
+            sharded_predictor = ShardedPredictor(
+                INFERENCE_WORKERS, spec.model_id, spec.revision, SENTIMENT_BACKEND
+            )
+    return sharded_predictor
+
+
+def analyze_sentiment(
+    df,
+    column_name="Why satisfied text area",
+    batch_size=INFERENCE_BATCH_SIZE,
+    progress_callback=None,
+    model_key=None,
+    window_stats=None,
+    known=None,
+):
+    """Perform sentiment analysis on the specified column of the dataframe
+
+    ``column_name`` may also be a list of columns: the responses of all of
+    them are pooled into shared batches in one pass, and each column gets
+    its own output pair (see ``sentiment_columns``). ``known`` maps a column
+    to per-row (sentiment, confidence) tuples, or None, that are kept
+    instead of scored.
+
+    ``progress_callback(rows_processed, rows_total)`` is invoked as batches
+    complete so callers can report progress. ``model_key`` selects a model
+    from the registry; the default model is used when it is empty. Responses
+    longer than the model context are scored in windows, counted in
+    ``window_stats`` when given.
+    """
+    sentiment_pipeline, prediction_cache = load_sentiment_model(model_key)
     if sentiment_pipeline is None:
-        if not load_sentiment_model():
-            return None, "Failed to load sentiment model"
+        return None, "Failed to load sentiment model"
 
+    columns = [column_name] if isinstance(column_name, str) else list(column_name)
     try:
-        # Check if required column exists
-        if column_name not in df.columns:
-            return None, f"Column '{column_name}' not found in the Excel file"
-
-        # Initialize sentiment columns
-        df["Sentiment"] = None
-        df["Confidence"] = None
-
-        sentiments = []
-        confidences = []
-
-        for idx, response in enumerate(df[column_name]):
-            if pd.isna(response) or response == "":
-                sentiments.append("UNKNOWN")
-                confidences.append(0.0)
-                continue
-
-            try:
-                # Get sentiment prediction
-                if sentiment_pipeline is not None:
-                    result = sentiment_pipeline(str(response))
-                else:
-                    sentiments.append("ERROR")
-                    confidences.append(0.0)
-                    continue
-
-                # Handle the pipeline result
-                if isinstance(result, list) and len(result) > 0:
-                    prediction = result[0]
-                elif hasattr(result, "__iter__") and not isinstance(result, str):
-                    try:
-                        result_list = list(result) if result is not None else []
-                        prediction = result_list[0] if result_list else {}
-                    except:
-                        prediction = {}
-                else:
-                    prediction = result if isinstance(result, dict) else {}
-
-                # Extract sentiment and confidence
-                sentiment = (
-                    prediction.get("label", "UNKNOWN")
-                    if isinstance(prediction, dict)
-                    else "UNKNOWN"
-                )
-                confidence = (
-                    prediction.get("score", 0.0)
-                    if isinstance(prediction, dict)
-                    else 0.0
-                )
+        # Check if required columns exist
+        for column in columns:
+            if column not in df.columns:
+                return None, f"Column '{column}' not found in the Excel file"
+
+        total_rows = len(df)
+        total_cells = total_rows * len(columns)
+
+        def report_cells(done):
+            # Progress is counted in cells and reported in rows
+            progress_callback(done * total_rows // max(total_cells, 1), total_rows)
+
+        def score_uncached(batch):
+            # Empty, known and cached cells are done by the time the model is called
+            offset = total_cells - len(batch)
+            report = None
+            if progress_callback is not None:
+                report_cells(offset)
+                report = lambda done: report_cells(offset + done)
+            predictor = get_sharded_predictor(model_key)
+            # The whole uncached stream is sharded; only a handful of texts,
+            # fewer than one per worker, stays in process
+            if predictor is not None and len(batch) > predictor.workers:
+                try:
+                    return predictor.predict(batch, batch_size, report, window_stats)
+                except BrokenProcessPool as e:
+                    # The pool was already restarted once; the parent has the
+                    # model loaded, so the run still completes
+                    logging.error(f"Worker pool unavailable, scoring in process: {e}")
+            return predict_batched(
+                sentiment_pipeline, batch, batch_size, report, window_stats
+            )
 
-                sentiments.append(sentiment)
-                confidences.append(confidence)
+        # Empty and known responses are never sent to the model; the rest of
+        # every column are pooled and scored through the prediction cache
+        start_time = time.perf_counter()
+        scored = score_columns(
+            df,
+            columns,
+            lambda texts: prediction_cache.predict(texts, score_uncached),
+            known,
+        )
+        logging.info(f"Prediction cache: {prediction_cache.stats()}")
+        elapsed = time.perf_counter() - start_time
 
-            except Exception as e:
-                logging.warning(f"Error processing response {idx + 1}: {e}")
-                sentiments.append("ERROR")
-                confidences.append(0.0)
+        if progress_callback is not None:
+            progress_callback(total_rows, total_rows)
 
-        # Update the dataframe
-        df["Sentiment"] = sentiments
-        df["Confidence"] = confidences
+        if scored:
+            logging.info(
+                f"Scored {scored} responses from {len(columns)} column(s) "
+                f"in {elapsed:.2f}s ({scored / max(elapsed, 1e-9):.1f} rows/sec, "
+                f"batch size {batch_size})"
+            )
 
         return df, None
 
@@ -305,8 +799,67 @@ def analyze_sentiment(df, column_name="Why satisfied text area"):
         return None, f"Error during sentiment analysis: {e}"
 
 
-def create_visualizations(df):
-    """Create all visualizations and return as base64 encoded images"""
+def analyze_incrementally(
+    df,
+    column_name,
+    hashes,
+    prior,
+    batch_size=INFERENCE_BATCH_SIZE,
+    progress_callback=None,
+    model_key=None,
+    window_stats=None,
+):
+    """Score only the responses without a prior prediction; returns
+    (df, reused, error)
+
+    ``hashes`` maps each analyzed column to its rows' hashes (see
+    ``row_store.row_hashes``) and ``prior`` maps each column to the
+    hash -> (sentiment, confidence) predictions of an earlier run. Matching
+    responses keep those labels; the rest go through ``analyze_sentiment``.
+    """
+    columns = [column_name] if isinstance(column_name, str) else list(column_name)
+    known = {}
+    reused = 0
+    for column in columns:
+        column_prior = (prior or {}).get(column)
+        column_hashes = (hashes or {}).get(column)
+        if not column_prior or not column_hashes:
+            continue
+        known[column] = [column_prior.get(h) for h in column_hashes]
+        reused += sum(m is not None for m in known[column])
+
+    df, error = analyze_sentiment(
+        df,
+        column_name,
+        batch_size,
+        progress_callback,
+        model_key,
+        window_stats,
+        known,
+    )
+    if error or df is None:
+        return None, 0, error
+    return df, reused, None
+
+
+@lru_cache(maxsize=None)
+def get_pyplot():
+    """Import and configure matplotlib on first use; it is slow to import"""
+    import matplotlib
+
+    matplotlib.use("Agg")  # Use non-interactive backend
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    # Configure matplotlib and seaborn
+    plt.style.use("default")
+    sns.set_palette("husl")
+    return plt
+
+
+def create_visualizations(aggregates, dpi=CHART_DPI):
+    """Create all visualizations from chart aggregates and return PNG bytes by name"""
+    plt = get_pyplot()
     plots = {}
 
     # BYUI Brand Colors
@@ -326,7 +879,7 @@ def create_visualizations(df):
     try:
         # 1. Sentiment Distribution Bar Chart
         plt.figure(figsize=(10, 6))
-        sentiment_counts = df["Sentiment"].value_counts()
+        sentiment_counts = pd.Series(aggregates["sentiment_counts"], dtype=int)
 
         # Map sentiments to BYUI colors
         color_map = {
@@ -365,7 +918,7 @@ def create_visualizations(df):
         plt.grid(axis="y", alpha=0.3)
 
         # Add percentage labels
-        total = len(df)
+        total = aggregates["total"]
         for i, (sentiment, count) in enumerate(sentiment_counts.items()):
             percentage = (count / total) * 100
             plt.text(
@@ -381,9 +934,8 @@ def create_visualizations(df):
 
         plt.tight_layout()
         img = io.BytesIO()
-        plt.savefig(img, format="png", dpi=300, bbox_inches="tight")
-        img.seek(0)
-        plots["sentiment_distribution"] = base64.b64encode(img.getvalue()).decode()
+        plt.savefig(img, format="png", dpi=dpi, bbox_inches="tight")
+        plots["sentiment_distribution"] = img.getvalue()
         plt.close()
 
         # 2. Sentiment Pie Chart
@@ -403,9 +955,12 @@ def create_visualizations(df):
             startangle=90,
         )
 
-        # Handle different return types from pie chart
-        if len(pie_result) >= 3:
-            wedges, texts, autotexts = pie_result
+        # Handle different return types from pie chart (a tuple on older
+        # matplotlib, a PieContainer on newer releases)
+        autotexts = getattr(pie_result, "autotexts", None)
+        if autotexts is None and isinstance(pie_result, tuple) and len(pie_result) >= 3:
+            autotexts = pie_result[2]
+        if autotexts:
             for autotext in autotexts:
                 autotext.set_color("white")
                 autotext.set_fontweight("bold")
@@ -421,19 +976,20 @@ def create_visualizations(df):
 
         plt.tight_layout()
         img = io.BytesIO()
-        plt.savefig(img, format="png", dpi=300, bbox_inches="tight")
-        img.seek(0)
-        plots["sentiment_pie"] = base64.b64encode(img.getvalue()).decode()
+        plt.savefig(img, format="png", dpi=dpi, bbox_inches="tight")
+        plots["sentiment_pie"] = img.getvalue()
         plt.close()
 
         # 3. Confidence Analysis
-        if "Confidence" in df.columns:
+        if "confidence_histogram" in aggregates:
             fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(15, 12))
 
             # Confidence distribution
+            histogram = aggregates["confidence_histogram"]
             ax1.hist(
-                df["Confidence"],
-                bins=20,
+                histogram["edges"][:-1],
+                bins=histogram["edges"],
+                weights=histogram["counts"],
                 color=byui_colors["primary"],
                 alpha=0.7,
                 edgecolor=byui_colors["black"],
@@ -444,27 +1000,24 @@ def create_visualizations(df):
             ax1.grid(alpha=0.3)
 
             # Box plot by sentiment
-            sns.boxplot(
-                data=df,
-                x="Sentiment",
-                y="Confidence",
-                ax=ax2,
-                palette=[
-                    color_map.get(sentiment, byui_colors["primary"])
-                    for sentiment in df["Sentiment"].unique()
-                ],
-            )
+            boxes = aggregates.get("confidence_boxes", [])
+            if boxes:
+                box_result = ax2.bxp(boxes, patch_artist=True)
+                for patch, box in zip(box_result["boxes"], boxes):
+                    patch.set_facecolor(
+                        color_map.get(box["label"], byui_colors["primary"])
+                    )
+            ax2.set_xlabel("Sentiment")
+            ax2.set_ylabel("Confidence")
             ax2.set_title("Confidence Scores by Sentiment", fontweight="bold")
             ax2.tick_params(axis="x", rotation=45)
 
             # Confidence vs response length
-            if "Why satisfied text area" in df.columns:
-                df["Response_Length"] = (
-                    df["Why satisfied text area"].astype(str).str.len()
-                )
+            if "length_confidence" in aggregates:
+                points = np.array(aggregates["length_confidence"]).reshape(-1, 2)
                 ax3.scatter(
-                    df["Response_Length"],
-                    df["Confidence"],
+                    points[:, 0],
+                    points[:, 1],
                     alpha=0.6,
                     color=byui_colors["accent"],
                 )
@@ -474,9 +1027,10 @@ def create_visualizations(df):
                 ax3.grid(alpha=0.3)
 
             # Confidence level distribution
-            high_conf = len(df[df["Confidence"] >= 0.8])
-            med_conf = len(df[(df["Confidence"] >= 0.5) & (df["Confidence"] < 0.8)])
-            low_conf = len(df[df["Confidence"] < 0.5])
+            levels = aggregates["confidence_levels"]
+            high_conf = levels["high"]
+            med_conf = levels["medium"]
+            low_conf = levels["low"]
 
             categories = ["High\n(≥0.8)", "Medium\n(0.5-0.8)", "Low\n(<0.5)"]
             counts = [high_conf, med_conf, low_conf]
@@ -507,9 +1061,8 @@ def create_visualizations(df):
 
             plt.tight_layout()
             img = io.BytesIO()
-            plt.savefig(img, format="png", dpi=300, bbox_inches="tight")
-            img.seek(0)
-            plots["confidence_analysis"] = base64.b64encode(img.getvalue()).decode()
+            plt.savefig(img, format="png", dpi=dpi, bbox_inches="tight")
+            plots["confidence_analysis"] = img.getvalue()
             plt.close()
 
         return plots
@@ -519,81 +1072,69 @@ def create_visualizations(df):
         return {}
 
 
-def generate_insights(df, column_name="Why satisfied text area"):
-    """Generate key insights from the data"""
-    insights = {}
-
-    try:
-        # Basic statistics
-        insights["total_responses"] = len(df)
-        insights["columns"] = list(df.columns)
-        insights["column_analyzed"] = column_name
-
-        # Sentiment distribution
-        if "Sentiment" in df.columns:
-            sentiment_counts = df["Sentiment"].value_counts()
-            insights["sentiment_distribution"] = sentiment_counts.to_dict()
-
-            most_common = sentiment_counts.index[0]
-            most_common_pct = (sentiment_counts.iloc[0] / len(df)) * 100
-            insights["most_common_sentiment"] = {
-                "sentiment": most_common,
-                "count": sentiment_counts.iloc[0],
-                "percentage": round(most_common_pct, 1),
-            }
-
-        # Confidence statistics
-        if "Confidence" in df.columns:
-            conf_stats = df["Confidence"].describe()
-            insights["confidence_stats"] = {
-                "mean": round(conf_stats["mean"], 3),
-                "median": round(conf_stats["50%"], 3),
-                "min": round(conf_stats["min"], 3),
-                "max": round(conf_stats["max"], 3),
-                "std": round(conf_stats["std"], 3),
-            }
-
-            high_conf_count = len(df[df["Confidence"] >= 0.8])
-            high_conf_pct = (high_conf_count / len(df)) * 100
-            insights["high_confidence"] = {
-                "count": high_conf_count,
-                "percentage": round(high_conf_pct, 1),
-            }
-
-            # Most confident sentiment
-            conf_by_sentiment = (
-                df.groupby("Sentiment")["Confidence"]
-                .mean()
-                .sort_values(ascending=False)
-            )
-            if len(conf_by_sentiment) > 0:
-                insights["most_confident_sentiment"] = {
-                    "sentiment": conf_by_sentiment.index[0],
-                    "avg_confidence": round(conf_by_sentiment.iloc[0], 3),
-                }
+def chart_rendering_mode(default_only=False):
+    """Return "server" or "client"; requests may override with ?charts="""
+    mode = CHART_RENDERING
+    if not default_only and has_request_context():
+        mode = request.args.get("charts", mode)
+    return mode if mode in ("server", "client") else "server"
 
-        # Response length analysis
-        if column_name in df.columns:
-            df["Response_Length"] = df[column_name].astype(str).str.len()
-            avg_length = df["Response_Length"].mean()
-            insights["avg_response_length"] = round(avg_length, 0)
 
-            length_by_sentiment = (
-                df.groupby("Sentiment")["Response_Length"]
-                .mean()
-                .sort_values(ascending=False)
-            )
-            if len(length_by_sentiment) > 0:
-                insights["longest_responses_sentiment"] = {
-                    "sentiment": length_by_sentiment.index[0],
-                    "avg_length": round(length_by_sentiment.iloc[0], 0),
-                }
-
-        return insights
+def get_chart_aggregates(run_id, run_data=None):
+    """Return a run's stored chart aggregates, computing them once for older runs"""
+    run_data = run_data or get_analysis_by_id(run_id)
+    if not run_data:
+        return None
+    if run_data["chart_aggregates"]:
+        return run_data["chart_aggregates"]
 
-    except Exception as e:
-        logging.error(f"Error generating insights: {e}")
-        return {}
+    # Runs from before aggregates were stored read the result file back once
+    result_filepath = os.path.join(
+        app.config["RESULTS_FOLDER"], run_data["result_filename"]
+    )
+    if not os.path.exists(result_filepath):
+        return None
+    chart_columns = ["Sentiment", "Confidence", "Why satisfied text area"]
+    header = read_header(result_filepath)
+    df = read_excel_columns(result_filepath, [c for c in chart_columns if c in header])
+    aggregates = compute_frame_stats(df, "Why satisfied text area").chart_aggregates()
+    save_chart_aggregates(run_id, aggregates)
+    return aggregates
+
+
+def run_chart_urls(run_id, run_data=None):
+    """Chart URLs of a stored run, drawing charts missing on disk from its aggregates"""
+    charts = chart_urls(run_id)
+    if not charts:
+        aggregates = get_chart_aggregates(run_id, run_data)
+        if aggregates:
+            save_charts(run_id, create_visualizations(aggregates))
+            charts = chart_urls(run_id)
+    return charts
+
+
+def chart_dir(run_key):
+    """Directory holding the stored chart images of a run"""
+    return os.path.join(app.config["CHART_FOLDER"], secure_filename(str(run_key)))
+
+
+def save_charts(run_key, images):
+    """Write rendered chart images for a run to disk"""
+    directory = chart_dir(run_key)
+    os.makedirs(directory, exist_ok=True)
+    for name, data in images.items():
+        with open(os.path.join(directory, f"{name}.png"), "wb") as fh:
+            fh.write(data)
+
+
+def chart_urls(run_key):
+    """Return {chart name: URL} for the charts stored for a run"""
+    directory = chart_dir(run_key)
+    return {
+        name: url_for("chart", run_key=str(run_key), name=name)
+        for name in CHART_NAMES
+        if os.path.exists(os.path.join(directory, f"{name}.png"))
+    }
 
 
 @app.route("/")
@@ -621,12 +1162,36 @@ def upload_file():
         filepath = os.path.join(app.config["UPLOAD_FOLDER"], filename)
         file.save(filepath)
 
+        # Convert to the columnar cache in the background; readers use the
+        # workbook itself until the cache is ready
+        ingest_executor.submit(build_columnar_cache, filepath)
+
         return redirect(url_for("preview", filename=filename))
     else:
         flash("Please upload an Excel file (.xlsx or .xls)")
         return redirect(request.url)
 
 
+@lru_cache(maxsize=PREVIEW_CACHE_SIZE)
+def load_preview(filepath, mtime_ns, size):
+    """Build the preview table for an upload; cached per file version
+
+    The modification time and size are part of the cache key, so a replaced
+    upload is re-read while revisiting an unchanged one is instant.
+    """
+    # Read only the header and first rows for the preview
+    preview_df, total_rows = read_preview(filepath, PREVIEW_ROWS)
+
+    # Convert to HTML table
+    preview_table = preview_df.to_html(
+        classes="table table-striped table-hover",
+        table_id="previewTable",
+        escape=False,
+    )
+
+    return preview_table, list(preview_df.columns), total_rows, len(preview_df)
+
+
 @app.route("/preview/<filename>")
 def preview(filename):
     """Preview the uploaded Excel file and allow column selection"""
@@ -638,31 +1203,21 @@ def preview(filename):
             flash(f"File not found: {filename}")
             return redirect(url_for("index"))
 
-        df = pd.read_excel(filepath)
-
-        # Get first 10 rows for preview
-        preview_df = df.head(10)
-
-        # Convert to HTML table
-        preview_table = preview_df.to_html(
-            classes="table table-striped table-hover",
-            table_id="previewTable",
-            escape=False,
+        stat = os.stat(filepath)
+        preview_table, columns, total_rows, preview_rows = load_preview(
+            filepath, stat.st_mtime_ns, stat.st_size
         )
 
-        # Get column names for selection
-        columns = list(df.columns)
-
-        # Get basic info
-        total_rows = len(df)
-
         return render_template(
             "preview.html",
             filename=filename,
             preview_table=preview_table,
             columns=columns,
             total_rows=total_rows,
-            preview_rows=len(preview_df),
+            preview_rows=preview_rows,
+            models=MODEL_REGISTRY,
+            default_model=DEFAULT_MODEL,
+            incremental_default=parse_flag(INCREMENTAL_BY_DEFAULT),
         )
 
     except Exception as e:
@@ -675,107 +1230,578 @@ def preview(filename):
 def analyze(filename):
     """Perform sentiment analysis on uploaded file"""
     # Get selected column from query parameter
-    column_name = request.args.get("column", "Why satisfied text area")
-    return analyze_with_column(filename, column_name)
+    # Several columns (?column=A&column=B) are analyzed together in one pass
+    columns = request.args.getlist("column") or ["Why satisfied text area"]
+    return analyze_with_column(filename, columns)
 
 
 @app.route("/analyze/<filename>/<column_name>")
 def analyze_with_column(filename, column_name):
-    """Perform sentiment analysis on uploaded file with specified column"""
-    global analysis_results
+    """Queue sentiment analysis of the uploaded file and show its progress
 
-    start_time = datetime.now()
+    ``column_name`` is one column or, from ``/analyze/<filename>``, a list.
+    """
+    filepath = os.path.join(app.config["UPLOAD_FOLDER"], filename)
+    if not os.path.exists(filepath):
+        flash(f"File not found: {filename}")
+        return redirect(url_for("index"))
 
-    try:
-        # Load the Excel file
-        filepath = os.path.join(app.config["UPLOAD_FOLDER"], filename)
-        df = pd.read_excel(filepath)
+    model_key = request.args.get("model") or DEFAULT_MODEL
+    if get_model_spec(model_key) is None:
+        flash(f"Unknown model: {model_key}")
+        return redirect(url_for("preview", filename=filename))
 
-        # Check if model is loaded
-        if not load_sentiment_model():
-            flash("Error loading sentiment analysis model")
-            return redirect(url_for("index"))
+    profile = profiling_requested(request.args.get("profile"))
+    incremental = parse_flag(request.args.get("incremental", INCREMENTAL_BY_DEFAULT))
+    job = submit_analysis(
+        filename,
+        column_name,
+        model_key,
+        profile,
+        incremental,
+        request.args.get("survey"),
+        request.args.get("batch_size", INFERENCE_BATCH_SIZE, type=int),
+        request.args.getlist("key"),
+    )
+    return redirect(url_for("results", job_id=job.id))
+
+
+def submit_analysis(
+    filename,
+    column_name,
+    model_key=None,
+    profile=False,
+    incremental=False,
+    survey_name=None,
+    batch_size=INFERENCE_BATCH_SIZE,
+    key_columns=None,
+):
+    """Queue an analysis job on the worker pool and return it
+
+    Callers parse every option from their own request (query string, form
+    or JSON body), so this works outside a request context too.
+    """
+    columns = [column_name] if isinstance(column_name, str) else list(column_name)
+    key_columns = list(key_columns or [])
+    profile = profile or PROFILE_ALL_RUNS
+    return job_manager.submit(
+        run_profiled_analysis if profile else run_analysis,
+        filename,
+        columns,
+        batch_size,
+        key_columns,
+        model_key,
+        incremental,
+        survey_name,
+        description=f"{filename} [{', '.join(columns)}]"
+        + (" (profiled)" if profile else ""),
+    )
 
-        # Perform sentiment analysis
-        analyzed_df, error = analyze_sentiment(df, column_name)
-        if error or analyzed_df is None:
-            flash(f"Error during analysis: {error}")
-            return redirect(url_for("index"))
 
-        # Save analyzed results
-        result_filename = f"analyzed_{filename}"
-        result_filepath = os.path.join(app.config["RESULTS_FOLDER"], result_filename)
-        analyzed_df.to_excel(result_filepath, index=False)
+def run_profiled_analysis(job, *args, **kwargs):
+    """Run an analysis under cProfile and store the profile next to the run
 
-        # Generate visualizations
-        plots = create_visualizations(analyzed_df)
+    Only the job's own thread is profiled; time spent waiting on the
+    background Excel parser shows up as waits in ``prefetch``. A failed run
+    keeps its partial profile under ``job-<id>``.
+    """
+    try:
+        result, profiler = run_profiled(run_analysis, job, *args, **kwargs)
+    except Exception as e:
+        profiler = getattr(e, "profiler", None)
+        if profiler is not None:
+            save_profile(profiler, PROFILE_FOLDER, f"job-{job.id}")
+        raise
+    save_profile(profiler, PROFILE_FOLDER, result["run_key"])
+    return result
+
+
+def run_analysis(
+    job,
+    filename,
+    columns,
+    batch_size=INFERENCE_BATCH_SIZE,
+    key_columns=None,
+    model_key=None,
+    incremental=False,
+    survey_name=None,
+):
+    """Run the full analysis for a job; raises on failure
+
+    The duration of each stage (read, model_load, inference, insights,
+    export, db, visualizations, row_store) is stored with the run and added
+    to the process-wide metrics. ``columns`` is the text column or list of
+    columns to analyze; their responses are scored together in one pass.
+    With ``incremental``, responses whose text and key columns match the
+    previous run of the same survey keep that run's labels and only new or
+    changed ones are scored.
+    """
+    columns = [columns] if isinstance(columns, str) else list(columns)
+    start_time = datetime.now()
+    timer = StageTimer()
+
+    # Inspect the sheet without parsing its rows
+    job.set_stage("reading")
+    filepath = os.path.join(app.config["UPLOAD_FOLDER"], filename)
+    with timer.stage("read"):
+        header = read_header(filepath)
+        for column in columns:
+            if column not in header:
+                raise RuntimeError(f"Column '{column}' not found in the Excel file")
+        key_columns = [c for c in key_columns or [] if c in header and c not in columns]
+        job.rows_total = estimate_row_count(filepath) or 0
+
+    # Check if model is loaded
+    job.set_stage("loading model")
+    spec = get_model_spec(model_key)
+    with timer.stage("model_load"):
+        pipe, cache = load_sentiment_model(model_key)
+    if pipe is None:
+        raise RuntimeError("Error loading sentiment analysis model")
+
+    # Row hashes are stored with every run so the next upload of the same
+    # survey can be scored incrementally against it
+    survey_name = survey_name or survey_name_for(filename)
+    keep_hashes = rows_available()
+    base_run_id, prior = None, {}
+    if incremental and keep_hashes:
+        with timer.stage("incremental"):
+            base_run_id = find_previous_run(
+                survey_name,
+                columns,
+                key_columns,
+                spec.model_id,
+                cache.model_revision,
+            )
+            if base_run_id is not None:
+                base_path = run_rows_path(RUN_ROWS_FOLDER, base_run_id)
+                prior = {
+                    column: load_prior_predictions(base_path, key_columns, column)
+                    for column in columns
+                }
+        logging.info(
+            f"Incremental run of {survey_name}: base run {base_run_id}, "
+            f"{sum(len(p) for p in prior.values())} prior responses"
+        )
+
+    # Score chunks as they are parsed; only the text and key columns are read.
+    # Parsing runs ahead on another thread, so "read" is the time spent
+    # waiting for the next chunk. Each chunk's rows go to the row file and
+    # only its labels, confidences and lengths are kept, so memory stays flat
+    # however large the file is
+    job.set_stage("scoring")
+    chunk_arrays = {column: [] for column in columns}
+    processed = 0
+    rows_reused = 0
+    responses = 0
+    window_stats = new_window_stats()
+    rows_writer = RunRowsWriter(RUN_ROWS_FOLDER) if keep_hashes else None
+    chunk_iter = prefetch(iter_excel_chunks(filepath, columns + key_columns))
+    try:
+        while True:
+            with timer.stage("read"):
+                chunk = next(chunk_iter, None)
+            if chunk is None:
+                break
+            chunk_hashes = None
+            if keep_hashes:
+                with timer.stage("incremental"):
+                    chunk_hashes = {
+                        column: row_hashes(chunk, column, key_columns)
+                        for column in columns
+                    }
+                responses += sum(
+                    h is not None for hashes in chunk_hashes.values() for h in hashes
+                )
+            with timer.stage("inference"):
+                analyzed_chunk, reused, error = analyze_incrementally(
+                    chunk,
+                    columns,
+                    chunk_hashes,
+                    prior,
+                    batch_size,
+                    lambda done, _total: job.update_progress(processed + done),
+                    model_key,
+                    window_stats,
+                )
+            if error or analyzed_chunk is None:
+                raise RuntimeError(f"Error during analysis: {error}")
+            if rows_writer is not None:
+                with timer.stage("row_store"):
+                    rows_writer.write(
+                        analyzed_chunk, columns, key_columns, chunk_hashes
+                    )
+            for column, arrays in column_arrays(analyzed_chunk, columns).items():
+                chunk_arrays[column].append(arrays)
+            processed += len(chunk)
+            rows_reused += reused
+
+        if processed:
+            arrays = {
+                column: concat_arrays(parts) for column, parts in chunk_arrays.items()
+            }
+        else:
+            arrays = column_arrays(
+                pd.DataFrame(
+                    columns=columns
+                    + [name for pair in sentiment_columns(columns) for name in pair]
+                ),
+                columns,
+            )
+        job.rows_total = processed
+
+        # The analyzed workbook is an export built on first download from the
+        # run's row file; it is written now only when row files are unavailable
+        result_filename = f"analyzed_{job.id[:8]}_{filename}"
+        if not rows_available():
+            job.set_stage("exporting")
+            with timer.stage("export"):
+                output = {}
+                for column, (sentiment_column, confidence_column) in zip(
+                    columns, sentiment_columns(columns)
+                ):
+                    sentiments, confidences, _lengths = arrays[column]
+                    output[sentiment_column] = sentiments.tolist()
+                    output[confidence_column] = confidences.tolist()
+                write_results_workbook(
+                    filepath,
+                    os.path.join(app.config["RESULTS_FOLDER"], result_filename),
+                    output,
+                )
 
-        # Generate insights
-        insights = generate_insights(analyzed_df, column_name)
+        # Generate visualizations
+        # Insights and chart aggregates come from a single pass over the rows;
+        # in client rendering mode the browser draws the charts from the aggregates
+        with timer.stage("insights"):
+            # Several columns are summarized together, then one by one
+            stats = compute_stats(*concat_arrays(arrays.values()))
+            chart_aggregates = stats.chart_aggregates()
+            insights = stats.insights(", ".join(columns), header)
+            if len(columns) > 1:
+                insights["per_column"] = {
+                    column: compute_stats(*parts).insights(column)
+                    for column, parts in arrays.items()
+                }
+            insights["windowing"] = window_overhead(window_stats)
+            if incremental and keep_hashes:
+                insights["incremental"] = {
+                    "base_run_id": base_run_id,
+                    "rows_reused": rows_reused,
+                    "rows_scored": responses - rows_reused,
+                }
+        if window_stats["long_texts"]:
+            logging.info(f"Long responses scored in windows: {insights['windowing']}")
 
         # Calculate processing time
         end_time = datetime.now()
         processing_time = (end_time - start_time).total_seconds()
+        rows_per_second = compute_throughput(processed, processing_time)
 
         # Save to database
-        run_id = save_analysis_to_db(
-            filename, result_filename, insights, processing_time
+        job.set_stage("saving")
+        with timer.stage("db"):
+            run_id = save_analysis_to_db(
+                filename,
+                result_filename,
+                insights,
+                processing_time,
+                chart_aggregates,
+                spec.model_id,
+                cache.model_revision,
+                timer.as_dict(),
+                rows_per_second,
+                {
+                    "survey_name": survey_name,
+                    "column_analyzed": ", ".join(columns),
+                    "text_columns": columns,
+                    "key_columns": key_columns,
+                    "base_run_id": base_run_id,
+                    "rows_reused": rows_reused,
+                },
+            )
+
+        # Charts are stored once per run and served as separate, cacheable files
+        run_key = str(run_id) if run_id is not None else f"job-{job.id}"
+        if chart_rendering_mode(default_only=True) == "server" or run_id is None:
+            job.set_stage("rendering charts")
+            with timer.stage("visualizations"):
+                save_charts(run_key, create_visualizations(chart_aggregates))
+
+        if rows_writer is not None:
+            job.set_stage("storing rows")
+            with timer.stage("row_store"):
+                rows_writer.commit(run_rows_path(RUN_ROWS_FOLDER, run_key), columns)
+
+        # Stages after the insert are added to the stored timings
+        if run_id is not None:
+            save_stage_timings(run_id, timer.as_dict())
+        record_stage_metrics(timer)
+        logging.info(f"Run {run_key} stage timings (s): {timer.as_dict()}")
+
+        # The result pages read only insights and metadata; rows stay in the row
+        # file, so no response text is kept in memory after the run
+        result_store.put(
+            run_key,
+            {
+                "insights": insights,
+                "filename": result_filename,
+                "original_filename": filename,
+                "run_id": run_id,
+                "processing_time": processing_time,
+                "rows_per_second": rows_per_second,
+                "column_analyzed": ", ".join(columns),
+                "model_id": spec.model_id,
+                "stage_timings": timer.as_dict(),
+            },
         )
+        return {"run_key": run_key, "run_id": run_id}
+    finally:
+        # Removes the partial file of a failed run; a no-op once committed
+        if rows_writer is not None:
+            rows_writer.discard()
 
-        # Store results globally
-        analysis_results = {
-            "df": analyzed_df,
-            "plots": plots,
-            "insights": insights,
-            "filename": result_filename,
-            "original_filename": filename,
-            "run_id": run_id,
-            "processing_time": processing_time,
-            "column_analyzed": column_name,
-        }
 
-        return redirect(url_for("results"))
+def export_results_workbook(run_key, original_filename, result_filename):
+    """Return ``(path, error)`` of a run's analyzed workbook
 
-    except Exception as e:
-        flash(f"Error processing file: {e}")
-        return redirect(url_for("index"))
+    The workbook is generated from the uploaded file and the run's row file
+    the first time it is requested, then reused. Runs stored before row files
+    existed only have the workbook written at analysis time.
+    """
+    result_filepath = os.path.join(app.config["RESULTS_FOLDER"], result_filename)
+    rows_path = run_rows_path(RUN_ROWS_FOLDER, run_key)
+    if os.path.exists(result_filepath):
+        return result_filepath, None
+    if not os.path.exists(rows_path):
+        return None, "Result file no longer exists"
+
+    source_filepath = os.path.join(app.config["UPLOAD_FOLDER"], original_filename)
+    if not os.path.exists(source_filepath):
+        return None, "Uploaded file no longer exists"
+
+    with export_lock:
+        if not os.path.exists(result_filepath):
+            export_start = time.perf_counter()
+            # Files from before multi-column runs hold one unnamed column
+            text_columns = run_text_columns(rows_path) or [None]
+            output = {}
+            for column, (sentiment_column, confidence_column) in zip(
+                text_columns, sentiment_columns(text_columns)
+            ):
+                rows = read_run_rows(
+                    rows_path,
+                    ["row_index", "sentiment", "confidence"],
+                    text_column=column,
+                ).sort_values("row_index")
+                output[sentiment_column] = rows["sentiment"].tolist()
+                output[confidence_column] = rows["confidence"].tolist()
+            write_results_workbook(source_filepath, result_filepath, output)
+            stage_seconds.observe(time.perf_counter() - export_start, stage="export")
+    return result_filepath, None
+
+
+def find_run_key():
+    """Resolve the run a /results or /download request addresses
+
+    Returns ``(run_key, job)``; ``job`` is set only while the requested job has
+    not completed, and both are None when nothing matches. A malformed run
+    id is answered with 404 before it reaches the result store.
+    """
+    run_key = request.args.get("run_id")
+    if run_key:
+        if not is_valid_key(run_key):
+            abort(404)
+        return run_key, None
+
+    # The worker pool is shared, so a job is only ever found by its id
+    job_id = request.args.get("job_id")
+    job = job_manager.get(job_id) if job_id else None
+    if job is None:
+        return None, None
+    if job.state != COMPLETED:
+        return None, job
+    return job.result["run_key"], None
 
 
 @app.route("/results")
 def results():
-    """Display analysis results"""
-    global analysis_results
+    """Display analysis results, or progress while the job is still running"""
+    run_key, job = find_run_key()
+
+    if job is not None:
+        if job.state == FAILED:
+            flash(f"Error processing file: {job.error}")
+            return redirect(url_for("index"))
+        return render_template("job_progress.html", job=job.to_dict())
 
-    if not analysis_results:
+    result = result_store.get(run_key) if run_key else None
+    if result is None:
+        # Runs no longer held by the store are still available from history
+        if run_key and run_key.isdigit():
+            return redirect(url_for("view_analysis", run_id=int(run_key)))
         flash("No analysis results available")
         return redirect(url_for("index"))
 
+    charts, aggregates_url = {}, None
+    if chart_rendering_mode() == "client" and run_key.isdigit():
+        aggregates_url = url_for("run_aggregates", run_id=int(run_key))
+    elif run_key.isdigit():
+        charts = run_chart_urls(int(run_key))
+    else:
+        charts = chart_urls(run_key)
+
     return render_template(
         "results.html",
-        insights=analysis_results["insights"],
-        plots=analysis_results["plots"],
-        filename=analysis_results["filename"],
+        insights=result["insights"],
+        charts=charts,
+        aggregates_url=aggregates_url,
+        filename=result["filename"],
+        processing_time=result["processing_time"],
+        rows_per_second=result["rows_per_second"],
+        model_id=result.get("model_id"),
+        run_key=run_key,
     )
 
 
 @app.route("/download")
 def download():
     """Download analyzed Excel file"""
-    global analysis_results
+    run_key, _job = find_run_key()
 
-    if not analysis_results:
+    result = result_store.get(run_key) if run_key else None
+    if result is None:
+        if run_key and run_key.isdigit():
+            return redirect(url_for("download_analysis", run_id=int(run_key)))
         flash("No analysis results available")
         return redirect(url_for("index"))
 
-    filepath = os.path.join(app.config["RESULTS_FOLDER"], analysis_results["filename"])
+    filepath, error = export_results_workbook(
+        run_key, result["original_filename"], result["filename"]
+    )
+    if error:
+        flash(error)
+        return redirect(url_for("index"))
     return send_file(filepath, as_attachment=True)
 
 
+@app.route("/charts/<run_key>/<name>.png")
+def chart(run_key, name):
+    """Serve a stored chart image with ETag and long-lived caching"""
+    if name not in CHART_NAMES:
+        return jsonify({"error": "Unknown chart"}), 404
+
+    filepath = os.path.join(chart_dir(run_key), f"{name}.png")
+    if not os.path.exists(filepath):
+        return jsonify({"error": "Chart not found"}), 404
+
+    # Charts never change for a run, so browsers may cache them for a day and
+    # revalidate cheaply against the ETag afterwards
+    return send_file(filepath, mimetype="image/png", etag=True, max_age=CHART_MAX_AGE)
+
+
+def page_args(filters, cursor):
+    """Query arguments for the next history page, omitting unset filters"""
+    args = {key: value for key, value in filters.items() if value}
+    args["cursor"] = cursor
+    return args
+
+
+def profile_url(run_key):
+    """URL of a run's profile report, or None when it was not profiled"""
+    if os.path.exists(profile_path(PROFILE_FOLDER, run_key)):
+        return url_for("run_profile", run_key=run_key)
+    return None
+
+
+def attach_profile_urls(runs):
+    for run in runs:
+        run["profile_url"] = profile_url(run["id"])
+    return runs
+
+
+@app.route("/profile/<run_key>")
+def run_profile(run_key):
+    """Serve a run's profile: the text report, or the pstats file with ?download=1"""
+    run_key = secure_filename(run_key)
+    if parse_flag(request.args.get("download")):
+        path = profile_path(PROFILE_FOLDER, run_key)
+        if os.path.exists(path):
+            return send_file(
+                path,
+                as_attachment=True,
+                download_name=f"run_{run_key}.prof",
+                mimetype="application/octet-stream",
+            )
+    else:
+        path = report_path(PROFILE_FOLDER, run_key)
+        if os.path.exists(path):
+            return send_file(path, mimetype="text/plain")
+    return jsonify({"error": "Profile not found"}), 404
+
+
 @app.route("/history")
 def history():
-    """Display analysis history"""
-    runs = get_analysis_history()
-    return render_template("history.html", runs=runs)
+    """Display one page of analysis history"""
+    filters, error = parse_history_filters(request.args)
+    if error:
+        flash(error)
+        return redirect(url_for("history"))
+
+    runs, next_cursor = get_analysis_history(**filters)
+    attach_profile_urls(runs)
+    next_url = None
+    if next_cursor:
+        next_url = url_for("history", **page_args(filters, next_cursor))
+    return render_template(
+        "history.html", runs=runs, filters=filters, next_url=next_url
+    )
+
+
+@app.route("/api/history")
+def api_history():
+    """API endpoint returning one page of analysis history as JSON"""
+    filters, error = parse_history_filters(request.args)
+    if error:
+        return jsonify({"error": error}), 400
+
+    limit = request.args.get("limit", HISTORY_PAGE_SIZE, type=int)
+    limit = min(max(limit, 1), HISTORY_MAX_PAGE_SIZE)
+    runs, next_cursor = get_analysis_history(**filters, limit=limit)
+    attach_profile_urls(runs)
+    next_url = None
+    if next_cursor:
+        next_url = url_for(
+            "api_history", **page_args(filters, next_cursor), limit=limit
+        )
+    return jsonify({"runs": runs, "next_cursor": next_cursor, "next_url": next_url})
+
+
+def get_column_insights(run_id, run_data):
+    """Insights of each column of a multi-column run, stored with the run
+
+    Multi-column runs from before they were stored read the row file back
+    once; single-column runs have none.
+    """
+    if run_data["column_insights"] is not None:
+        return run_data["column_insights"]
+    if len(run_data["text_columns"]) < 2:
+        return {}
+
+    rows_path = run_rows_path(RUN_ROWS_FOLDER, run_id)
+    if not os.path.exists(rows_path):
+        return {}
+    insights = {}
+    for column in run_data["text_columns"]:
+        rows = read_run_rows(
+            rows_path, ["sentiment", "confidence", "length"], text_column=column
+        )
+        insights[column] = compute_stats(
+            rows["sentiment"].to_numpy(),
+            rows["confidence"].to_numpy(),
+            rows["length"].to_numpy(),
+        ).insights(column)
+    save_column_insights(run_id, insights)
+    return insights
 
 
 @app.route("/view/<int:run_id>")
@@ -786,18 +1812,23 @@ def view_analysis(run_id):
         flash("Analysis run not found")
         return redirect(url_for("history"))
 
-    # Check if result file still exists
+    # Check if the run's rows or result file still exist
     result_filepath = os.path.join(
         app.config["RESULTS_FOLDER"], run_data["result_filename"]
     )
-    if not os.path.exists(result_filepath):
+    if not (
+        os.path.exists(run_rows_path(RUN_ROWS_FOLDER, run_id))
+        or os.path.exists(result_filepath)
+    ):
         flash("Result file no longer exists")
         return redirect(url_for("history"))
 
-    # Load the Excel file and regenerate visualizations
     try:
-        df = pd.read_excel(result_filepath)
-        plots = create_visualizations(df)
+        charts, aggregates_url = {}, None
+        if chart_rendering_mode() == "client":
+            aggregates_url = url_for("run_aggregates", run_id=run_id)
+        else:
+            charts = run_chart_urls(run_id, run_data)
 
         # Prepare insights from database data
         insights = {
@@ -812,10 +1843,16 @@ def view_analysis(run_id):
                 "count": run_data["high_confidence_count"],
                 "percentage": run_data["high_confidence_percentage"],
             },
+            "per_column": get_column_insights(run_id, run_data),
         }
 
         return render_template(
-            "view_analysis.html", run_data=run_data, insights=insights, plots=plots
+            "view_analysis.html",
+            run_data=run_data,
+            insights=insights,
+            charts=charts,
+            aggregates_url=aggregates_url,
+            profile_url=profile_url(run_id),
         )
 
     except Exception as e:
@@ -831,9 +1868,11 @@ def download_analysis(run_id):
         flash("Analysis run not found")
         return redirect(url_for("history"))
 
-    filepath = os.path.join(app.config["RESULTS_FOLDER"], run_data["result_filename"])
-    if not os.path.exists(filepath):
-        flash("Result file no longer exists")
+    filepath, error = export_results_workbook(
+        run_id, run_data["original_filename"], run_data["result_filename"]
+    )
+    if error:
+        flash(error)
         return redirect(url_for("history"))
 
     return send_file(
@@ -850,18 +1889,23 @@ def delete_analysis(run_id):
         run_data = get_analysis_by_id(run_id)
         if run_data:
             # Delete from database
-            conn = sqlite3.connect(DATABASE_FILE)
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM analysis_runs WHERE id = ?", (run_id,))
-            conn.commit()
-            conn.close()
+            with db.connection() as conn:
+                conn.execute("DELETE FROM analysis_runs WHERE id = ?", (run_id,))
 
             # Delete result file if it exists
             result_filepath = os.path.join(
                 app.config["RESULTS_FOLDER"], run_data["result_filename"]
             )
-            if os.path.exists(result_filepath):
-                os.remove(result_filepath)
+            for path in (
+                result_filepath,
+                run_rows_path(RUN_ROWS_FOLDER, run_id),
+                profile_path(PROFILE_FOLDER, run_id),
+                report_path(PROFILE_FOLDER, run_id),
+            ):
+                if os.path.exists(path):
+                    os.remove(path)
+            shutil.rmtree(chart_dir(run_id), ignore_errors=True)
+            result_store.discard(run_id)
 
             flash("Analysis deleted successfully")
         else:
@@ -873,11 +1917,176 @@ def delete_analysis(run_id):
     return redirect(url_for("history"))
 
 
+def payload_list(payload, name):
+    """A repeatable field of a JSON body (a value or a list) or of a form"""
+    if isinstance(payload, dict):
+        value = payload.get(name)
+        if value is None:
+            return []
+        return [value] if isinstance(value, str) else list(value)
+    return payload.getlist(name)
+
+
+@app.route("/api/jobs", methods=["POST"])
+def create_job():
+    """API endpoint to queue an analysis; returns the job id immediately"""
+    payload = request.get_json(silent=True) or request.form
+    filename = payload.get("filename", "")
+    # "column" is one column name, or a list to analyze together
+    column_name = payload_list(payload, "column") or ["Why satisfied text area"]
+    key_columns = payload_list(payload, "key")
+    try:
+        batch_size = int(payload.get("batch_size", INFERENCE_BATCH_SIZE))
+    except (TypeError, ValueError):
+        return jsonify({"error": "batch_size must be an integer"}), 400
+    model_key = payload.get("model") or DEFAULT_MODEL
+    profile = profiling_requested(payload.get("profile"))
+    incremental = parse_flag(payload.get("incremental", INCREMENTAL_BY_DEFAULT))
+
+    filepath = os.path.join(app.config["UPLOAD_FOLDER"], secure_filename(filename))
+    if not filename or not os.path.exists(filepath):
+        return jsonify({"error": f"File not found: {filename}"}), 404
+    if get_model_spec(model_key) is None:
+        return jsonify({"error": f"Unknown model: {model_key}"}), 400
+
+    job = submit_analysis(
+        secure_filename(filename),
+        column_name,
+        model_key,
+        profile,
+        incremental,
+        payload.get("survey"),
+        batch_size,
+        key_columns,
+    )
+    response = jsonify(job.to_dict())
+    response.headers["Location"] = url_for("job_status", job_id=job.id)
+    return response, 202
+
+
+@app.route("/api/jobs/<job_id>")
+def job_status(job_id):
+    """API endpoint reporting state, progress, throughput and ETA of a job"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+
+    data = job.to_dict()
+    if job.state == COMPLETED:
+        data["results_url"] = url_for("results", run_id=job.result["run_key"])
+    return jsonify(data)
+
+
+@app.route("/api/runs/<int:run_id>/rows")
+def run_rows(run_id):
+    """API endpoint returning a run's row-level results, optionally filtered"""
+    rows_path = run_rows_path(RUN_ROWS_FOLDER, run_id)
+    if not os.path.exists(rows_path):
+        return jsonify({"error": "Run rows not found"}), 404
+
+    rows = read_run_rows(
+        rows_path,
+        sentiments=request.args.getlist("sentiment") or None,
+        min_confidence=request.args.get("min_confidence", type=float),
+        max_confidence=request.args.get("max_confidence", type=float),
+        text_column=request.args.get("column"),
+    )
+    offset = max(request.args.get("offset", 0, type=int), 0)
+    limit = min(max(request.args.get("limit", 100, type=int), 1), RUN_ROWS_MAX_LIMIT)
+    page = rows.iloc[offset : offset + limit]
+    return jsonify(
+        {
+            "run_id": run_id,
+            "total": len(rows),
+            "offset": offset,
+            "rows": json.loads(page.to_json(orient="records")),
+        }
+    )
+
+
+@app.route("/api/runs/<int:run_id>/aggregates")
+def run_aggregates(run_id):
+    """API endpoint returning the compact chart aggregates of a run as JSON"""
+    aggregates = get_chart_aggregates(run_id)
+    if aggregates is None:
+        return jsonify({"error": "Run not found"}), 404
+
+    # Aggregates never change for a run, so clients revalidate by ETag
+    response = jsonify(aggregates)
+    response.add_etag()
+    response.cache_control.public = True
+    response.cache_control.max_age = CHART_MAX_AGE
+    return response.make_conditional(request)
+
+
+@app.route("/api/models")
+def list_models():
+    """API endpoint listing the selectable models and which are loaded"""
+    loaded = {(m["model_id"], m["revision"]) for m in pipeline_cache.loaded()}
+    return jsonify(
+        {
+            "default": DEFAULT_MODEL,
+            "models": [
+                {
+                    "key": spec.key,
+                    "model_id": spec.model_id,
+                    "revision": spec.revision,
+                    "description": spec.description,
+                    "loaded": (spec.model_id, spec.revision) in loaded,
+                }
+                for spec in MODEL_REGISTRY.values()
+            ],
+            "pipeline_cache": pipeline_cache.stats(),
+        }
+    )
+
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response):
+    """Count each request and observe its latency, labelled by route"""
+    started = g.pop("request_started", None)
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    http_requests_total.inc(
+        endpoint=endpoint, method=request.method, status=response.status_code
+    )
+    if started is not None:
+        http_request_seconds.observe(time.perf_counter() - started, endpoint=endpoint)
+    return response
+
+
+@app.route("/api/metrics")
+def api_metrics():
+    """Process-wide counters and latency histograms in Prometheus text format"""
+    return metrics.render(), 200, {"Content-Type": METRICS_CONTENT_TYPE}
+
+
 @app.route("/api/status")
 def status():
     """API endpoint to check model status"""
-    model_loaded = sentiment_pipeline is not None
-    return jsonify({"model_loaded": model_loaded})
+    default_spec = get_model_spec()
+    model_loaded = (
+        default_spec is not None
+        and pipeline_cache.peek(default_spec, SENTIMENT_BACKEND) is not None
+    )
+    cache = prediction_caches.get(default_spec)
+    cache_stats = cache.stats() if cache is not None else None
+    model = get_model_status()
+    return jsonify(
+        {
+            "model_loaded": model_loaded,
+            "ready": model["state"] in ("loaded", "ready"),
+            "model": model,
+            "backend": SENTIMENT_BACKEND,
+            "prediction_cache": cache_stats,
+            "pipeline_cache": pipeline_cache.stats(),
+            "result_store": result_store.stats(),
+        }
+    )
 
 
 if __name__ == "__main__":
@@ -889,13 +2098,11 @@ if __name__ == "__main__":
     init_database()
     print("✅ Database initialized!")
 
-    # Load model on startup
+    # Load and warm up the model in the background so pages respond at once;
+    # progress is reported by /api/status
     print("🚀 Starting Sentiment Analysis Application...")
-    print("📥 Loading sentiment analysis model...")
-    if load_sentiment_model():
-        print("✅ Model loaded successfully!")
-    else:
-        print("❌ Failed to load model")
+    print("📥 Loading sentiment analysis model in the background...")
+    start_model_warmup()
 
     print("🌐 Starting Flask server...")
     print("🔗 Application will be available at: http://localhost:5001")
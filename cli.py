@@ -0,0 +1,347 @@
+# Command-line batch analysis of many survey workbooks with one warm model
+import argparse
+import glob
+import logging
+import os
+import time
+
+from excel_io import prefetch, read_excel_columns, read_header, write_results_workbook
+from inference import (
+    load_pipeline,
+    new_window_stats,
+    predict_batched,
+    score_columns,
+    ShardedPredictor,
+    window_overhead,
+)
+from model_registry import DEFAULT_MODEL_KEY, load_registry
+from prediction_cache import PredictionCache, cache_revision
+from sentiment_stats import compute_frame_stats, sentiment_columns
+from timing import StageTimer
+
+DEFAULT_COLUMN = "Why satisfied text area"
+WORKBOOK_EXTENSIONS = (".xlsx", ".xls")
+OUTPUT_FORMATS = ("xlsx", "csv", "parquet")
+OUTPUT_SUFFIX = "_with_sentiment"
+PREDICTION_CACHE_FILE = "prediction_cache.db"
+
+logger = logging.getLogger(__name__)
+
+
+def find_workbooks(patterns):
+    """Expand files, directories and glob patterns into workbook paths
+
+    Returns ``(paths, unmatched)``: the workbooks in order without
+    duplicates, and the patterns that matched nothing. Excel lock files and
+    this tool's own outputs are skipped.
+    """
+    paths, unmatched = [], []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = [
+                os.path.join(pattern, name) for name in sorted(os.listdir(pattern))
+            ]
+        else:
+            # Globs are expanded here too, for shells that do not expand them
+            matches = sorted(glob.glob(pattern, recursive=True))
+        matches = [
+            path
+            for path in matches
+            if os.path.isfile(path)
+            and path.lower().endswith(WORKBOOK_EXTENSIONS)
+            and not os.path.basename(path).startswith("~$")
+            and not os.path.splitext(path)[0].endswith(OUTPUT_SUFFIX)
+        ]
+        if not matches:
+            unmatched.append(pattern)
+        paths.extend(matches)
+    return list(dict.fromkeys(paths)), unmatched
+
+
+def output_paths(paths, output_dir, output_format):
+    """Where the analyzed copy of each workbook is written, keyed by path
+
+    Outputs go next to their input, or under ``output_dir`` in the same
+    subfolders the inputs have below their common parent, so workbooks of
+    the same name in different folders do not overwrite each other.
+    """
+    base = None
+    if output_dir and paths:
+        base = os.path.commonpath(
+            [os.path.dirname(os.path.abspath(path)) for path in paths]
+        )
+    outputs = {}
+    for path in paths:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        folder = os.path.dirname(path)
+        if output_dir:
+            subfolder = os.path.relpath(os.path.dirname(os.path.abspath(path)), base)
+            folder = os.path.normpath(os.path.join(output_dir, subfolder))
+        outputs[path] = os.path.join(folder, f"{stem}{OUTPUT_SUFFIX}.{output_format}")
+    return outputs
+
+
+def read_workbooks(paths, columns, read_columns=None):
+    """Yield ``(path, df, error)`` per workbook
+
+    Only ``read_columns`` are parsed (every column when None). A workbook
+    that cannot be read, or lacks one of ``columns``, yields an error
+    instead of stopping the batch.
+    """
+    for path in paths:
+        try:
+            header = read_header(path)
+            missing = [column for column in columns if column not in header]
+            if missing:
+                yield path, None, f"column '{missing[0]}' not found"
+                continue
+            yield path, read_excel_columns(path, read_columns), None
+        except Exception as e:
+            yield path, None, str(e)
+
+
+def write_output(path, df, columns, result_path, output_format):
+    """Write the analyzed copy of a workbook in the requested format"""
+    extra = {
+        name: df[name].tolist() for pair in sentiment_columns(columns) for name in pair
+    }
+    os.makedirs(os.path.dirname(result_path) or ".", exist_ok=True)
+    if output_format == "xlsx":
+        # Streams the source sheet, so only the text columns were read
+        write_results_workbook(path, result_path, extra)
+    elif output_format == "csv":
+        df.to_csv(result_path, index=False)
+    else:
+        df.to_parquet(result_path, index=False)
+
+
+def analyze_workbooks(
+    paths,
+    columns,
+    spec,
+    output_format="xlsx",
+    output_dir=None,
+    batch_size=32,
+    workers=1,
+    backend="pytorch",
+    cache_path=PREDICTION_CACHE_FILE,
+):
+    """Score every workbook with one load of the ``spec`` model; returns a
+    summary dict
+
+    The next workbook is parsed on a background thread while the current
+    one is scored, so "read" in the stage timings is only the time spent
+    waiting for it.
+    """
+    timer = StageTimer()
+    start_time = time.perf_counter()
+
+    logger.info(f"Loading {spec.model_id}...")
+    with timer.stage("model_load"):
+        pipe = load_pipeline(spec.model_id, spec.revision, backend)
+    cache = PredictionCache(
+        cache_path,
+        spec.model_id,
+        cache_revision(spec.model_id, spec.revision, backend, pipe),
+    )
+
+    window_stats = new_window_stats()
+    predictor = None
+    if workers > 1:
+        predictor = ShardedPredictor(workers, spec.model_id, spec.revision, backend)
+        score_texts = lambda batch: predictor.predict(
+            batch, batch_size, window_stats=window_stats
+        )
+    else:
+        score_texts = lambda batch: predict_batched(
+            pipe, batch, batch_size, window_stats=window_stats
+        )
+
+    # xlsx output streams the source sheet again; other formats are written
+    # from the frame, so every column is read up front
+    read_columns = columns if output_format == "xlsx" else None
+    outputs = output_paths(paths, output_dir, output_format)
+    written = {}
+    files = []
+    workbooks = prefetch(read_workbooks(paths, columns, read_columns), depth=1)
+    try:
+        while True:
+            with timer.stage("read"):
+                item = next(workbooks, None)
+            if item is None:
+                break
+            path, df, error = item
+            file_start = time.perf_counter()
+            result = {"path": path, "rows": 0, "responses": 0, "error": error}
+            files.append(result)
+            # Inputs with the same name in one folder (x.xls and x.xlsx)
+            # still share an output, so the later one is not written
+            result["output"] = outputs[path]
+            if not error and result["output"] in written:
+                result["error"] = error = (
+                    f"{result['output']} already holds the results of "
+                    f"{written[result['output']]}"
+                )
+            if error:
+                logger.error(f"{path}: {error}")
+                continue
+
+            try:
+                with timer.stage("inference"):
+                    result["responses"] = score_columns(
+                        df, columns, lambda texts: cache.predict(texts, score_texts)
+                    )
+                with timer.stage("export"):
+                    write_output(path, df, columns, result["output"], output_format)
+            except Exception as e:
+                result["error"] = str(e)
+                logger.error(f"{path}: {e}")
+                continue
+            written[result["output"]] = path
+
+            result["rows"] = len(df)
+            result["seconds"] = time.perf_counter() - file_start
+            stats = compute_frame_stats(df, columns)
+            if stats.most_common_sentiment:
+                sentiment, count = stats.most_common_sentiment
+                result["most_common"] = f"{sentiment} ({stats.percentage(count):.1f}%)"
+            logger.info(
+                f"{path}: {result['rows']} rows in {result['seconds']:.2f}s "
+                f"-> {result['output']}"
+            )
+    finally:
+        if predictor is not None:
+            predictor.close()
+
+    elapsed = time.perf_counter() - start_time
+    rows = sum(f["rows"] for f in files)
+    responses = sum(f["responses"] for f in files)
+    return {
+        "model_id": spec.model_id,
+        "files": files,
+        "analyzed": sum(1 for f in files if not f["error"]),
+        "failed": sum(1 for f in files if f["error"]),
+        "rows": rows,
+        "responses": responses,
+        "seconds": elapsed,
+        "rows_per_second": rows / elapsed if elapsed > 0 else 0.0,
+        "responses_per_second": responses / elapsed if elapsed > 0 else 0.0,
+        "stage_timings": timer.as_dict(),
+        "prediction_cache": cache.stats(),
+        "windowing": window_overhead(window_stats),
+    }
+
+
+def format_summary(summary):
+    """Human-readable throughput summary of a batch"""
+    lines = [""]
+    for f in summary["files"]:
+        if f["error"]:
+            lines.append(f"  FAILED  {f['path']}: {f['error']}")
+            continue
+        rate = f["rows"] / f["seconds"] if f["seconds"] > 0 else 0.0
+        lines.append(
+            f"  {f['path']}: {f['rows']} rows, {f['responses']} responses, "
+            f"{f['seconds']:.2f}s ({rate:.1f} rows/sec)"
+            + (f", most common {f['most_common']}" if f.get("most_common") else "")
+        )
+
+    cache = summary["prediction_cache"]
+    stages = ", ".join(
+        f"{stage} {seconds:.2f}s" for stage, seconds in summary["stage_timings"].items()
+    )
+    lines += [
+        "",
+        f"Model:        {summary['model_id']}",
+        f"Files:        {summary['analyzed']} analyzed, {summary['failed']} failed",
+        f"Rows:         {summary['rows']} ({summary['responses']} responses, "
+        f"cache hit rate {cache['hit_rate']:.1%})",
+        f"Stages:       {stages}",
+        f"Total time:   {summary['seconds']:.2f}s "
+        f"({summary['rows_per_second']:.1f} rows/sec, "
+        f"{summary['responses_per_second']:.1f} responses/sec)",
+    ]
+    if summary["windowing"]["long_texts"]:
+        lines.append(f"Windowing:    {summary['windowing']}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    """Analyze the sentiment of survey workbooks in batch"""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument(
+        "inputs",
+        nargs="+",
+        help="Workbooks, directories of workbooks, or glob patterns (quote them)",
+    )
+    parser.add_argument(
+        "-c",
+        "--column",
+        action="append",
+        dest="columns",
+        help=f"Text column to analyze; repeat for several (default: {DEFAULT_COLUMN!r})",
+    )
+    parser.add_argument(
+        "-f", "--format", choices=OUTPUT_FORMATS, default="xlsx", dest="output_format"
+    )
+    parser.add_argument(
+        "-o",
+        "--output-dir",
+        help="Where to write results (default: next to each input)",
+    )
+    parser.add_argument(
+        "--model",
+        default=os.environ.get("SENTIMENT_MODEL", DEFAULT_MODEL_KEY),
+        help="Registry key of the model",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=int(os.environ.get("SENTIMENT_BATCH_SIZE", "32")),
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.environ.get("SENTIMENT_INFERENCE_WORKERS", "1")),
+        help="Worker processes for sharded inference",
+    )
+    parser.add_argument(
+        "--backend", default=os.environ.get("SENTIMENT_BACKEND", "pytorch")
+    )
+    parser.add_argument("--cache", default=PREDICTION_CACHE_FILE)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    paths, unmatched = find_workbooks(args.inputs)
+    for pattern in unmatched:
+        logger.warning(f"No workbooks match {pattern}")
+    if not paths:
+        print("No workbooks to analyze.")
+        return 2
+
+    registry = load_registry(
+        os.environ.get("SENTIMENT_MODEL_REGISTRY"),
+        default_revision=os.environ.get("SENTIMENT_MODEL_REVISION", "main"),
+    )
+    if args.model not in registry:
+        print(f"Unknown model: {args.model}")
+        return 2
+
+    summary = analyze_workbooks(
+        paths,
+        args.columns or [DEFAULT_COLUMN],
+        registry[args.model],
+        args.output_format,
+        args.output_dir,
+        args.batch_size,
+        args.workers,
+        args.backend,
+        args.cache,
+    )
+    print(format_summary(summary))
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
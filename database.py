@@ -0,0 +1,184 @@
+# SQLite connection layer and schema migrations for the analysis history
+import json
+import logging
+import sqlite3
+import threading
+
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -8000",
+)
+BUSY_TIMEOUT_SECONDS = 30
+STATEMENT_CACHE_SIZE = 256
+
+
+def _create_analysis_runs(conn):
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS analysis_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            original_filename TEXT NOT NULL,
+            result_filename TEXT NOT NULL,
+            upload_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            total_responses INTEGER,
+            sentiment_distribution TEXT,  -- JSON string
+            confidence_stats TEXT,       -- JSON string
+            avg_confidence REAL,
+            most_common_sentiment TEXT,
+            most_common_percentage REAL,
+            high_confidence_count INTEGER,
+            high_confidence_percentage REAL,
+            processing_time REAL
+        )
+    """
+    )
+
+
+def _add_chart_aggregates(conn):
+    # Databases from before versioning may already have the column
+    if "chart_aggregates" not in table_columns(conn, "analysis_runs"):
+        conn.execute("ALTER TABLE analysis_runs ADD COLUMN chart_aggregates TEXT")
+
+
+def _add_history_indexes(conn):
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_analysis_runs_upload_date
+        ON analysis_runs (upload_date DESC, id DESC)
+    """
+    )
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_analysis_runs_original_filename
+        ON analysis_runs (original_filename)
+    """
+    )
+
+
+def _add_model_columns(conn):
+    existing = table_columns(conn, "analysis_runs")
+    for column in ("model_id", "model_revision"):
+        if column not in existing:
+            conn.execute(f"ALTER TABLE analysis_runs ADD COLUMN {column} TEXT")
+
+
+def _add_stage_timings(conn):
+    existing = table_columns(conn, "analysis_runs")
+    if "stage_timings" not in existing:
+        # JSON object of seconds per analysis stage
+        conn.execute("ALTER TABLE analysis_runs ADD COLUMN stage_timings TEXT")
+    if "rows_per_second" not in existing:
+        conn.execute("ALTER TABLE analysis_runs ADD COLUMN rows_per_second REAL")
+
+
+def _add_survey_columns(conn):
+    existing = table_columns(conn, "analysis_runs")
+    for column, kind in (
+        ("survey_name", "TEXT"),
+        ("column_analyzed", "TEXT"),
+        ("key_columns", "TEXT"),  # JSON list
+        ("base_run_id", "INTEGER"),
+        ("rows_reused", "INTEGER"),
+    ):
+        if column not in existing:
+            conn.execute(f"ALTER TABLE analysis_runs ADD COLUMN {column} {kind}")
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_analysis_runs_survey
+        ON analysis_runs (survey_name, column_analyzed, id DESC)
+    """
+    )
+
+
+def _add_text_columns(conn):
+    if "text_columns" not in table_columns(conn, "analysis_runs"):
+        # JSON list of the analyzed text columns
+        conn.execute("ALTER TABLE analysis_runs ADD COLUMN text_columns TEXT")
+    # Earlier runs analyzed the single column in column_analyzed
+    rows = conn.execute(
+        """
+        SELECT id, column_analyzed FROM analysis_runs
+        WHERE column_analyzed IS NOT NULL AND text_columns IS NULL
+    """
+    ).fetchall()
+    conn.executemany(
+        "UPDATE analysis_runs SET text_columns = ? WHERE id = ?",
+        [(json.dumps([column]), run_id) for run_id, column in rows],
+    )
+
+
+def _add_column_insights(conn):
+    if "column_insights" not in table_columns(conn, "analysis_runs"):
+        # JSON object of insights per text column of a multi-column run
+        conn.execute("ALTER TABLE analysis_runs ADD COLUMN column_insights TEXT")
+
+
+# Applied in order; a database's PRAGMA user_version records how many have run.
+# Append new migrations to the end and never edit or reorder existing ones.
+MIGRATIONS = [
+    _create_analysis_runs,
+    _add_chart_aggregates,
+    _add_history_indexes,
+    _add_model_columns,
+    _add_stage_timings,
+    _add_survey_columns,
+    _add_text_columns,
+    _add_column_insights,
+]
+
+
+def table_columns(conn, table):
+    """Return the column names of a table"""
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def migrate(conn, migrations=MIGRATIONS):
+    """Bring a database up to the latest schema version; returns that version"""
+    (version,) = conn.execute("PRAGMA user_version").fetchone()
+    for number, migration in enumerate(migrations[version:], start=version + 1):
+        logging.info(f"Applying database migration {number}: {migration.__name__}")
+        with conn:
+            migration(conn)
+            conn.execute(f"PRAGMA user_version = {number}")
+    return len(migrations)
+
+
+class Database:
+    """Per-thread SQLite connections with WAL mode and tuned pragmas.
+
+    Each thread opens one connection on first use and keeps it, so repeated
+    queries reuse its prepared-statement cache instead of reconnecting. The
+    connection is closed when its thread exits.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def connection(self):
+        """Return this thread's connection, opening it on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.path,
+                timeout=BUSY_TIMEOUT_SECONDS,
+                cached_statements=STATEMENT_CACHE_SIZE,
+            )
+            for pragma in PRAGMAS:
+                conn.execute(pragma)
+            self._local.conn = conn
+        return conn
+
+    def migrate(self):
+        """Apply pending schema migrations"""
+        return migrate(self.connection())
+
+    def close(self):
+        """Close this thread's connection, if it has one"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
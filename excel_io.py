@@ -0,0 +1,483 @@
+# Streaming Excel ingestion and export
+import logging
+import os
+import queue
+import threading
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CHUNK_SIZE = 2000
+
+# Suffix of the Arrow IPC file cached next to each workbook
+CACHE_SUFFIX = ".arrow"
+
+# Only the OOXML formats can be streamed with openpyxl's read-only mode
+STREAMABLE_EXTENSIONS = {".xlsx", ".xlsm"}
+
+
+def is_streamable(path):
+    return os.path.splitext(path)[1].lower() in STREAMABLE_EXTENSIONS
+
+
+def _header_names(header_row):
+    """Name header cells the way pandas does, including duplicate mangling"""
+    header_row = list(header_row)
+    # Read-only sheets may pad the header with empty trailing cells
+    while header_row and header_row[-1] is None:
+        header_row.pop()
+
+    names = []
+    seen = {}
+    for idx, value in enumerate(header_row):
+        name = str(value) if value is not None else f"Unnamed: {idx}"
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _iter_data_rows(rows):
+    """Yield data rows, dropping trailing blank rows as pandas does"""
+    pending_blank = 0
+    for row in rows:
+        if all(value is None or value == "" for value in row):
+            pending_blank += 1
+            continue
+        for _ in range(pending_blank):
+            yield ()
+        pending_blank = 0
+        yield row
+
+
+def _open_sheet(path):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    return workbook, workbook.worksheets[0]
+
+
+def read_header(path):
+    """Return the column names of the first sheet without reading the data"""
+    if has_fresh_cache(path):
+        return _open_cache(columnar_cache_path(path)).schema.names
+    if not is_streamable(path):
+        return list(pd.read_excel(path, nrows=0).columns)
+
+    workbook, sheet = _open_sheet(path)
+    try:
+        header = next(sheet.iter_rows(max_row=1, values_only=True), ())
+        return _header_names(header)
+    finally:
+        workbook.close()
+
+
+def estimate_row_count(path):
+    """Return the data row count recorded in the sheet dimensions, if any
+
+    The count is exact when a fresh columnar cache exists.
+    """
+    if has_fresh_cache(path):
+        return _cache_row_count(columnar_cache_path(path))
+    if not is_streamable(path):
+        return None
+
+    workbook, sheet = _open_sheet(path)
+    try:
+        max_row = sheet.max_row
+        return max(max_row - 1, 0) if max_row else None
+    finally:
+        workbook.close()
+
+
+def read_preview(path, nrows=10):
+    """Return (first ``nrows`` rows as a DataFrame, total data row count)
+
+    Only the header and the first rows are parsed. The total comes from the
+    sheet dimension metadata, or from a value-only row scan when the writer
+    did not record dimensions.
+    """
+    if not is_streamable(path):
+        head = pd.read_excel(path, nrows=nrows)
+        total_rows = len(pd.read_excel(path, usecols=[0])) if len(head) else 0
+        return head, total_rows
+
+    workbook, sheet = _open_sheet(path)
+    try:
+        rows = sheet.iter_rows(values_only=True)
+        names = _header_names(next(rows, ()))
+
+        records = []
+        for row in rows:
+            if len(records) >= nrows:
+                break
+            row = tuple(row[: len(names)]) + (None,) * (len(names) - len(row))
+            records.append(row)
+        head = pd.DataFrame.from_records(records, columns=names)
+
+        max_row = sheet.max_row
+        if has_fresh_cache(path):
+            total_rows = _cache_row_count(columnar_cache_path(path))
+        elif max_row is None:
+            # Dimensions are missing; count the remaining rows without
+            # building any DataFrame
+            total_rows = len(records) + sum(1 for _ in rows)
+        else:
+            total_rows = max(max_row - 1, 0)
+        return head, total_rows
+    finally:
+        workbook.close()
+
+
+def iter_excel_chunks(path, columns=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield DataFrames of up to ``chunk_size`` rows from the first sheet
+
+    Only ``columns`` are materialized (all columns when None). A fresh
+    columnar cache is read through a memory map when one exists; otherwise
+    the sheet is read row by row in openpyxl read-only mode, so memory stays
+    bounded by the chunk size instead of the workbook size. Each chunk keeps
+    the original 0-based row positions as its index.
+    """
+    if has_fresh_cache(path):
+        yield from _iter_cache_chunks(columnar_cache_path(path), columns)
+        return
+    yield from _iter_sheet_chunks(path, columns, chunk_size)
+
+
+def _iter_sheet_chunks(path, columns=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    if not is_streamable(path):
+        # Legacy .xls cannot be streamed; project columns and chunk in memory
+        df = pd.read_excel(path, usecols=columns)
+        for start in range(0, len(df), chunk_size):
+            yield df.iloc[start : start + chunk_size]
+        return
+
+    workbook, sheet = _open_sheet(path)
+    try:
+        rows = sheet.iter_rows(values_only=True)
+        names = _header_names(next(rows, ()))
+
+        if columns is None:
+            columns = names
+        missing = [column for column in columns if column not in names]
+        if missing:
+            raise KeyError(f"Columns not found in the Excel file: {missing}")
+        positions = [names.index(column) for column in columns]
+
+        buffer = []
+        offset = 0
+        for row in _iter_data_rows(rows):
+            buffer.append(
+                tuple(row[pos] if pos < len(row) else None for pos in positions)
+            )
+            if len(buffer) >= chunk_size:
+                yield _chunk_frame(buffer, columns, offset)
+                offset += len(buffer)
+                buffer = []
+        if buffer:
+            yield _chunk_frame(buffer, columns, offset)
+    finally:
+        workbook.close()
+
+
+def _chunk_frame(rows, columns, offset):
+    return pd.DataFrame.from_records(
+        rows, columns=columns, index=pd.RangeIndex(offset, offset + len(rows))
+    )
+
+
+def read_excel_columns(path, columns=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Read only the given columns of the first sheet into one DataFrame"""
+    chunks = list(iter_excel_chunks(path, columns, chunk_size))
+    if not chunks:
+        return pd.DataFrame(columns=columns or read_header(path))
+    return pd.concat(chunks)
+
+
+def prefetch(iterable, depth=2):
+    """Iterate ``iterable`` on a background thread, keeping ``depth`` items ready
+
+    Lets the consumer (inference) start on the first chunk while later chunks
+    are still being parsed. Exceptions from the producer are re-raised in the
+    consumer.
+    """
+    items = queue.Queue(maxsize=depth)
+    done = object()
+    stop = threading.Event()
+
+    def put(item):
+        # Give up once the consumer has stopped instead of blocking forever
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+            put(done)
+        except BaseException as e:
+            put(e)
+
+    threading.Thread(target=produce, daemon=True, name="excel-prefetch").start()
+    try:
+        while True:
+            item = items.get()
+            if item is done:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+def write_results_workbook(
+    source_path,
+    result_path,
+    extra_columns,
+):
+    """Copy the source sheet to ``result_path`` with extra columns appended
+
+    ``extra_columns`` maps column names to per-row value lists; a name that
+    already exists in the sheet is overwritten in place. Rows are streamed
+    from the read-only source into a write-only workbook, so the full sheet
+    is never held in memory.
+    """
+    if not is_streamable(source_path):
+        df = pd.read_excel(source_path)
+        for name, values in extra_columns.items():
+            df[name] = values
+        df.to_excel(result_path, index=False)
+        return
+
+    from openpyxl import Workbook
+
+    workbook, sheet = _open_sheet(source_path)
+    output = Workbook(write_only=True)
+    output_sheet = output.create_sheet()
+    try:
+        rows = sheet.iter_rows(values_only=True)
+        header = _header_names(next(rows, ()))
+        width = len(header)
+
+        # Existing columns keep their position; new ones are appended
+        positions = {}
+        for name in extra_columns:
+            if name not in header:
+                header.append(name)
+            positions[name] = header.index(name)
+        output_sheet.append(header)
+
+        for idx, row in enumerate(_iter_data_rows(rows)):
+            row = list(row[:width]) + [None] * (len(header) - min(len(row), width))
+            for name, values in extra_columns.items():
+                row[positions[name]] = values[idx]
+            output_sheet.append(row)
+
+        output.save(result_path)
+    finally:
+        workbook.close()
+    logging.info(f"Results saved to {result_path}")
+
+
+def _pyarrow():
+    """Return pyarrow, or None when it is not installed"""
+    try:
+        import pyarrow
+
+        return pyarrow
+    except ImportError:
+        return None
+
+
+def columnar_cache_path(path):
+    """Path of the Arrow IPC cache stored alongside a workbook"""
+    return path + CACHE_SUFFIX
+
+
+def has_fresh_cache(path):
+    """True when a columnar cache exists and is not older than the workbook"""
+    cache_path = columnar_cache_path(path)
+    try:
+        return (
+            _pyarrow() is not None
+            and os.stat(cache_path).st_mtime_ns >= os.stat(path).st_mtime_ns
+        )
+    except OSError:
+        return False
+
+
+def _open_cache(cache_path):
+    import pyarrow as pa
+
+    # Memory-mapped, so batches are paged in lazily and never copied
+    return pa.ipc.open_file(pa.memory_map(cache_path, "r"))
+
+
+def _cache_row_count(cache_path):
+    reader = _open_cache(cache_path)
+    return sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+
+
+def _iter_cache_chunks(cache_path, columns=None):
+    import pyarrow as pa
+
+    reader = _open_cache(cache_path)
+    names = reader.schema.names
+    if columns is None:
+        columns = names
+    missing = [column for column in columns if column not in names]
+    if missing:
+        raise KeyError(f"Columns not found in the Excel file: {missing}")
+
+    offset = 0
+    for i in range(reader.num_record_batches):
+        table = pa.Table.from_batches([reader.get_batch(i)]).select(columns)
+        chunk = table.to_pandas()
+        chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+        offset += len(chunk)
+        yield chunk
+
+
+class ColumnarCacheWriter:
+    """Writes DataFrame chunks of a sheet to an Arrow IPC cache file
+
+    Column types are fixed by the first chunk: integer columns become int64
+    (so IDs read back as 1, not 1.0), other numeric columns float64,
+    datetimes become timestamps, booleans stay boolean and
+    everything else is stored as text. If a later chunk does not fit that
+    schema the cache is abandoned and readers fall back to the workbook.
+    The file is written under a temporary name and only published on
+    ``commit``, so readers never see a partial cache.
+    """
+
+    def __init__(self, source_path):
+        self.cache_path = columnar_cache_path(source_path)
+        self.temp_path = f"{self.cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        self.enabled = _pyarrow() is not None
+        self._writer = None
+        self._schema = None
+
+    def _schema_for(self, chunk):
+        import pyarrow as pa
+
+        fields = []
+        for name in chunk.columns:
+            series = chunk[name]
+            if pd.api.types.is_bool_dtype(series):
+                arrow_type = pa.bool_()
+            elif pd.api.types.is_integer_dtype(series):
+                arrow_type = pa.int64()
+            elif pd.api.types.is_numeric_dtype(series):
+                arrow_type = pa.float64()
+            elif pd.api.types.is_datetime64_any_dtype(series):
+                arrow_type = pa.timestamp("us")
+            else:
+                arrow_type = pa.string()
+            fields.append(pa.field(str(name), arrow_type))
+        return pa.schema(fields)
+
+    def _column_array(self, series, field):
+        import pyarrow as pa
+
+        if pa.types.is_string(field.type):
+            values = [
+                (
+                    None
+                    if value is None or (isinstance(value, float) and np.isnan(value))
+                    else str(value)
+                )
+                for value in series.tolist()
+            ]
+            return pa.array(values, type=pa.string())
+        if pa.types.is_integer(field.type):
+            # Raises on text or fractions in an integer column, abandoning the
+            # cache; missing values become nulls
+            return pa.array(
+                pd.to_numeric(series, errors="raise"),
+                type=field.type,
+                from_pandas=True,
+            )
+        if pa.types.is_floating(field.type):
+            # Raises on text in a numeric column, abandoning the cache
+            return pa.array(
+                pd.to_numeric(series, errors="raise").astype("float64"),
+                type=field.type,
+                from_pandas=True,
+            )
+        if pa.types.is_timestamp(field.type):
+            return pa.array(
+                pd.to_datetime(series, errors="raise"),
+                type=field.type,
+                from_pandas=True,
+            )
+        return pa.array(series, type=field.type, from_pandas=True)
+
+    def write(self, chunk):
+        if not self.enabled:
+            return
+        import pyarrow as pa
+
+        try:
+            if self._writer is None:
+                self._schema = self._schema_for(chunk)
+                self._writer = pa.ipc.new_file(self.temp_path, self._schema)
+            arrays = [
+                self._column_array(chunk[field.name], field) for field in self._schema
+            ]
+            self._writer.write_batch(
+                pa.RecordBatch.from_arrays(arrays, schema=self._schema)
+            )
+        except Exception as e:
+            logging.warning(f"Columnar cache disabled for {self.cache_path}: {e}")
+            self.abort()
+
+    def commit(self, columns=None):
+        """Finish the file and atomically replace any previous cache"""
+        if not self.enabled:
+            return False
+        import pyarrow as pa
+
+        if self._writer is None:
+            # Empty sheet: still record the header so readers can use it
+            schema = pa.schema([pa.field(str(c), pa.string()) for c in columns or []])
+            self._writer = pa.ipc.new_file(self.temp_path, schema)
+        self._writer.close()
+        os.replace(self.temp_path, self.cache_path)
+        return True
+
+    def abort(self):
+        self.enabled = False
+        if self._writer is not None:
+            try:
+                self._writer.close()
+            except Exception:
+                pass
+            self._writer = None
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+
+def build_columnar_cache(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Convert a workbook once into its columnar cache; returns True on success"""
+    if has_fresh_cache(path) or _pyarrow() is None:
+        return has_fresh_cache(path)
+
+    writer = ColumnarCacheWriter(path)
+    try:
+        for chunk in _iter_sheet_chunks(path, None, chunk_size):
+            writer.write(chunk)
+        return writer.commit(read_header(path))
+    except Exception as e:
+        logging.warning(f"Could not build columnar cache for {path}: {e}")
+        writer.abort()
+        return False
@@ -0,0 +1,10 @@
+# Parsing of on/off options from query strings, forms, JSON and the environment
+
+TRUE_VALUES = {"1", "true", "yes", "on"}
+
+
+def parse_flag(value):
+    """True for the usual truthy query, form, JSON or environment values"""
+    if isinstance(value, bool):
+        return value
+    return str(value or "").strip().lower() in TRUE_VALUES
@@ -0,0 +1,524 @@
+# Shared inference helpers for the web app and batch scripts
+import argparse
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+
+DEFAULT_MODEL_ID = "cardiffnlp/twitter-roberta-base-sentiment-latest"
+DEFAULT_BATCH_SIZE = 32
+
+# Responses longer than the model context are scored as overlapping windows
+DEFAULT_MAX_TOKENS = 512
+WINDOW_OVERLAP_TOKENS = 64
+
+# Number of shards handed to each worker process, so slow shards even out
+SHARDS_PER_WORKER = 4
+
+
+def load_pipeline(model_id=DEFAULT_MODEL_ID, revision="main", backend="pytorch"):
+    """Load a sentiment pipeline for the requested backend"""
+    if backend == "onnx-int8":
+        from onnx_backend import load_onnx_pipeline
+
+        return load_onnx_pipeline(model_id, revision)
+
+    from transformers.pipelines import pipeline
+
+    return pipeline("sentiment-analysis", model=model_id, revision=revision)
+
+
+def parse_prediction(result):
+    """Extract (label, score) from a single sentiment pipeline result"""
+    # Handle the pipeline result
+    if isinstance(result, list) and len(result) > 0:
+        prediction = result[0]
+    elif hasattr(result, "__iter__") and not isinstance(result, (str, dict)):
+        try:
+            result_list = list(result) if result is not None else []
+            prediction = result_list[0] if result_list else {}
+        except:
+            prediction = {}
+    else:
+        prediction = result if isinstance(result, dict) else {}
+
+    # Extract sentiment and confidence
+    sentiment = (
+        prediction.get("label", "UNKNOWN")
+        if isinstance(prediction, dict)
+        else "UNKNOWN"
+    )
+    confidence = prediction.get("score", 0.0) if isinstance(prediction, dict) else 0.0
+    return sentiment, confidence
+
+
+def _window_token_limit(tokenizer):
+    # Tokenizers without a configured limit report a huge sentinel value
+    max_tokens = getattr(tokenizer, "model_max_length", None) or DEFAULT_MAX_TOKENS
+    if max_tokens > 100_000:
+        max_tokens = DEFAULT_MAX_TOKENS
+    try:
+        special = tokenizer.num_special_tokens_to_add(pair=False)
+    except Exception:
+        special = 2
+    return max_tokens - special, special
+
+
+def split_windows(pipe, texts, overlap=WINDOW_OVERLAP_TOKENS):
+    """Split texts longer than the model context into overlapping token windows
+
+    Returns ``(windows, owners, weights)``: the texts to score, the index of
+    the input text each came from, and each window's length in tokens (used
+    to sort batches and to weight window scores). Texts that fit are passed
+    through as a single window. Without a tokenizer nothing is split and
+    character lengths are used.
+    """
+    tokenizer = getattr(pipe, "tokenizer", None)
+    if tokenizer is None:
+        return list(texts), list(range(len(texts))), [len(text) for text in texts]
+
+    limit, special = _window_token_limit(tokenizer)
+    try:
+        encoded = tokenizer(
+            list(texts),
+            add_special_tokens=False,
+            truncation=False,
+            return_offsets_mapping=True,
+        )
+        offsets = encoded["offset_mapping"]
+    except Exception:
+        # Slow tokenizers have no offsets; windows are decoded from ids instead
+        try:
+            encoded = tokenizer(list(texts), add_special_tokens=False, truncation=False)
+            offsets = None
+        except Exception as e:
+            logging.debug(f"Falling back to character lengths: {e}")
+            return list(texts), list(range(len(texts))), [len(t) for t in texts]
+
+    step = max(1, limit - overlap)
+    windows, owners, weights = [], [], []
+    for idx, (text, ids) in enumerate(zip(texts, encoded["input_ids"])):
+        if len(ids) <= limit:
+            windows.append(text)
+            owners.append(idx)
+            weights.append(len(ids) + special)
+            continue
+        for start in range(0, len(ids), step):
+            end = min(start + limit, len(ids))
+            if offsets is not None:
+                window = text[offsets[idx][start][0] : offsets[idx][end - 1][1]]
+            else:
+                window = tokenizer.decode(ids[start:end])
+            windows.append(window)
+            owners.append(idx)
+            weights.append(end - start + special)
+            if end == len(ids):
+                break
+    return windows, owners, weights
+
+
+def combine_window_predictions(predictions, weights):
+    """Merge window (label, score) pairs into one prediction for their response
+
+    Each label collects the token-weighted scores of the windows that chose
+    it; the label with the most support wins, and its confidence is that
+    support as a share of the response's total window weight.
+    """
+    support = {}
+    total = 0.0
+    for (label, score), weight in zip(predictions, weights):
+        if label == "ERROR":
+            continue
+        support[label] = support.get(label, 0.0) + score * weight
+        total += weight
+    if not support:
+        return "ERROR", 0.0
+    label = max(support, key=support.get)
+    return label, support[label] / total
+
+
+def new_window_stats():
+    """Counters filled in by ``predict_batched`` to report windowing overhead"""
+    return {
+        "texts": 0,
+        "long_texts": 0,
+        "windows": 0,
+        "split_seconds": 0.0,
+        "score_seconds": 0.0,
+    }
+
+
+def merge_window_stats(total, stats):
+    """Add one set of window counters into another, in place"""
+    for key, value in stats.items():
+        total[key] = total.get(key, 0) + value
+    return total
+
+
+def window_overhead(stats):
+    """Summarize windowing cost: extra sequences scored and time spent splitting
+
+    ``extra_sequence_ratio`` is the share of additional model inputs caused
+    by splitting, which is also the approximate share of scoring time.
+    """
+    texts = stats.get("texts", 0)
+    extra = stats.get("windows", 0) - texts
+    score_seconds = stats.get("score_seconds", 0.0)
+    ratio = extra / texts if texts else 0.0
+    return {
+        "long_texts": stats.get("long_texts", 0),
+        "windows": stats.get("windows", 0),
+        "extra_sequences": extra,
+        "extra_sequence_ratio": round(ratio, 4),
+        "split_seconds": round(stats.get("split_seconds", 0.0), 3),
+        "estimated_extra_seconds": round(
+            score_seconds * extra / max(texts + extra, 1), 3
+        ),
+    }
+
+
+def predict_batched(
+    pipe,
+    texts,
+    batch_size=DEFAULT_BATCH_SIZE,
+    progress_callback=None,
+    window_stats=None,
+):
+    """Score texts in length-bucketed batches and return (label, score) in input order
+
+    Texts longer than the model context are split into overlapping windows
+    that are scored alongside the short texts and combined back into one
+    prediction per text. Windows are sorted by token length before batching
+    so that each batch is padded only to its own longest member, then results
+    are scattered back to their original positions. ``progress_callback`` is
+    called with the approximate number of texts scored so far after every
+    batch; ``window_stats`` (see ``new_window_stats``) is updated in place.
+    """
+    texts = list(texts)
+    predictions = [("ERROR", 0.0)] * len(texts)
+    if not texts:
+        return predictions
+
+    batch_size = max(1, int(batch_size))
+    split_start = time.perf_counter()
+    windows, owners, lengths = split_windows(pipe, texts)
+    split_seconds = time.perf_counter() - split_start
+    order = sorted(range(len(windows)), key=lengths.__getitem__)
+    window_predictions = [("ERROR", 0.0)] * len(windows)
+
+    score_start = time.perf_counter()
+    for start in range(0, len(order), batch_size):
+        batch_indices = order[start : start + batch_size]
+        batch = [windows[i] for i in batch_indices]
+
+        try:
+            results = pipe(batch, batch_size=len(batch), truncation=True)
+        except Exception as e:
+            # Fall back to scoring the batch one text at a time so a single bad
+            # response does not fail its neighbours
+            logging.warning(f"Batch starting at {start} failed, retrying per row: {e}")
+            results = []
+            for idx, text in zip(batch_indices, batch):
+                try:
+                    results.append(pipe(text, truncation=True))
+                except Exception as row_error:
+                    logging.warning(
+                        f"Error processing response {owners[idx] + 1}: {row_error}"
+                    )
+                    results.append(None)
+
+        for idx, result in zip(batch_indices, results):
+            window_predictions[idx] = (
+                parse_prediction(result) if result is not None else ("ERROR", 0.0)
+            )
+
+        if progress_callback is not None:
+            done = start + len(batch)
+            progress_callback(done * len(texts) // len(windows))
+    score_seconds = time.perf_counter() - score_start
+
+    # Windows of a text are contiguous, so group them by owner in one pass
+    grouped = {}
+    for idx, owner in enumerate(owners):
+        grouped.setdefault(owner, []).append(idx)
+    for owner, indices in grouped.items():
+        if len(indices) == 1:
+            predictions[owner] = window_predictions[indices[0]]
+        else:
+            predictions[owner] = combine_window_predictions(
+                [window_predictions[i] for i in indices],
+                [lengths[i] for i in indices],
+            )
+
+    if window_stats is not None:
+        merge_window_stats(
+            window_stats,
+            {
+                "texts": len(texts),
+                "long_texts": sum(1 for v in grouped.values() if len(v) > 1),
+                "windows": len(windows),
+                "split_seconds": split_seconds,
+                "score_seconds": score_seconds,
+            },
+        )
+    return predictions
+
+
+def score_columns(df, columns, predict, known=None):
+    """Add the sentiment output columns of ``columns`` to ``df``
+
+    The responses of all columns are pooled into one list and passed to
+    ``predict`` in a single call, so they share model batches; it returns
+    one (label, score) per text. Empty responses (see
+    ``sentiment_stats.present_responses``) are marked UNKNOWN without being
+    scored. ``known`` maps a column to per-row (sentiment, confidence)
+    tuples, or None, that are kept instead of scored. Returns the number of
+    responses scored.
+    """
+    from sentiment_stats import present_responses, sentiment_columns
+
+    known = known or {}
+    cells, texts = [], []
+    labels = {}
+    for column in columns:
+        sentiments = ["UNKNOWN"] * len(df)
+        confidences = [0.0] * len(df)
+        prior = known.get(column) or [None] * len(df)
+        present = present_responses(df[column]).tolist()
+        for idx, (response, keep, prediction) in enumerate(
+            zip(df[column], present, prior)
+        ):
+            if prediction is not None:
+                sentiments[idx], confidences[idx] = prediction
+                continue
+            if not keep:
+                continue
+            cells.append((column, idx))
+            texts.append(str(response))
+        labels[column] = (sentiments, confidences)
+
+    for (column, idx), (sentiment, confidence) in zip(cells, predict(texts)):
+        labels[column][0][idx] = sentiment
+        labels[column][1][idx] = confidence
+
+    for column, (sentiment_column, confidence_column) in zip(
+        columns, sentiment_columns(columns)
+    ):
+        df[sentiment_column], df[confidence_column] = labels[column]
+    return len(texts)
+
+
+# Per-process pipeline loaded once by each worker's initializer
+_worker_pipeline = None
+
+
+def _init_worker(model_id, revision, backend, torch_threads):
+    global _worker_pipeline
+    if torch_threads:
+        try:
+            import torch
+
+            torch.set_num_threads(torch_threads)
+        except ImportError:
+            pass
+    _worker_pipeline = load_pipeline(model_id, revision, backend)
+
+
+def _score_shard(texts, batch_size):
+    stats = new_window_stats()
+    return (
+        predict_batched(_worker_pipeline, texts, batch_size, window_stats=stats),
+        stats,
+    )
+
+
+class ShardedPredictor:
+    """Scores texts across a pool of worker processes, each holding its own model
+
+    The pool is created on first use and kept alive, so workers load the model
+    once and reuse it for every later call.
+    """
+
+    def __init__(
+        self,
+        workers,
+        model_id=DEFAULT_MODEL_ID,
+        revision="main",
+        backend="pytorch",
+        torch_threads=None,
+    ):
+        self.workers = max(1, int(workers))
+        self.model_id = model_id
+        self.revision = revision
+        self.backend = backend
+        # Split the cores evenly so workers do not oversubscribe the CPU
+        self.torch_threads = torch_threads or max(
+            1, (os.cpu_count() or 1) // self.workers
+        )
+        self._executor = None
+
+    def _pool(self):
+        if self._executor is None:
+            # Spawned workers avoid inheriting torch's thread state from a fork
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(
+                    self.model_id,
+                    self.revision,
+                    self.backend,
+                    self.torch_threads,
+                ),
+            )
+        return self._executor
+
+    def predict(
+        self,
+        texts,
+        batch_size=DEFAULT_BATCH_SIZE,
+        progress_callback=None,
+        window_stats=None,
+    ):
+        """Return (label, score) per text in input order
+
+        A pool whose worker died is replaced and the call retried once; if
+        the new pool breaks too, or any shard raises, the error propagates
+        so the run fails instead of saving ERROR labels.
+        """
+        texts = list(texts)
+        if not texts:
+            return []
+        try:
+            return self._predict(texts, batch_size, progress_callback, window_stats)
+        except BrokenProcessPool as e:
+            logging.warning(f"Inference worker pool broke ({e}); restarting it")
+            self._discard_pool()
+        try:
+            return self._predict(texts, batch_size, progress_callback, window_stats)
+        except BrokenProcessPool:
+            self._discard_pool()
+            raise
+
+    def _predict(self, texts, batch_size, progress_callback, window_stats):
+        shard_count = min(len(texts), self.workers * SHARDS_PER_WORKER)
+        shard_size = -(-len(texts) // shard_count)
+        shards = [
+            (start, texts[start : start + shard_size])
+            for start in range(0, len(texts), shard_size)
+        ]
+
+        predictions = [None] * len(texts)
+        shard_stats = []
+        pool = self._pool()
+        futures = {
+            pool.submit(_score_shard, shard, batch_size): (start, len(shard))
+            for start, shard in shards
+        }
+
+        done = 0
+        try:
+            for future in as_completed(futures):
+                start, size = futures[future]
+                shard_predictions, stats = future.result()
+                predictions[start : start + size] = shard_predictions
+                shard_stats.append(stats)
+                done += size
+                if progress_callback is not None:
+                    progress_callback(done)
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+        # Merged only once every shard succeeded, so a retry never double counts
+        if window_stats is not None:
+            for stats in shard_stats:
+                merge_window_stats(window_stats, stats)
+        return predictions
+
+    def _discard_pool(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+def measure_speedup(
+    texts,
+    workers,
+    model_id=DEFAULT_MODEL_ID,
+    revision="main",
+    backend="pytorch",
+    batch_size=DEFAULT_BATCH_SIZE,
+):
+    """Time the single-process path against the sharded path on the same texts
+
+    Model load time is excluded from both measurements; the sharded pool is
+    warmed up with one tiny call before timing.
+    """
+    texts = list(texts)
+
+    pipe = load_pipeline(model_id, revision, backend)
+    start = time.perf_counter()
+    single = predict_batched(pipe, texts, batch_size)
+    single_seconds = time.perf_counter() - start
+
+    predictor = ShardedPredictor(workers, model_id, revision, backend)
+    try:
+        predictor.predict(texts[: predictor.workers], batch_size)
+        start = time.perf_counter()
+        parallel = predictor.predict(texts, batch_size)
+        parallel_seconds = time.perf_counter() - start
+    finally:
+        predictor.close()
+
+    matches = sum(1 for a, b in zip(single, parallel) if a[0] == b[0])
+    return {
+        "rows": len(texts),
+        "workers": predictor.workers,
+        "torch_threads_per_worker": predictor.torch_threads,
+        "single_seconds": round(single_seconds, 3),
+        "parallel_seconds": round(parallel_seconds, 3),
+        "single_rows_per_second": round(len(texts) / max(single_seconds, 1e-9), 1),
+        "parallel_rows_per_second": round(len(texts) / max(parallel_seconds, 1e-9), 1),
+        "speedup": round(single_seconds / max(parallel_seconds, 1e-9), 2),
+        "label_agreement": round(matches / len(texts), 4) if texts else 0.0,
+    }
+
+
+def main():
+    """Measure multi-process sharded inference against the single-process path"""
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("workbook", help="Excel file containing responses")
+    parser.add_argument("--column", default="Why satisfied text area")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--model", default=DEFAULT_MODEL_ID)
+    parser.add_argument("--revision", default="main")
+    parser.add_argument("--backend", default="pytorch")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    df = pd.read_excel(args.workbook, usecols=[args.column])
+    texts = df[args.column].dropna().astype(str)
+    texts = texts[texts != ""].tolist()
+
+    report = measure_speedup(
+        texts, args.workers, args.model, args.revision, args.backend, args.batch_size
+    )
+    for key, value in report.items():
+        print(f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+# Background job queue for long-running analyses
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+class AnalysisJob:
+    """State and progress of a single submitted analysis"""
+
+    def __init__(self, job_id, description=""):
+        self.id = job_id
+        self.description = description
+        self.state = QUEUED
+        self.stage = "queued"
+        self.rows_total = 0
+        self.rows_processed = 0
+        self.created_at = time.time()
+        self.started_at = None
+        self.progress_started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+
+    @property
+    def finished(self):
+        return self.state in (COMPLETED, FAILED)
+
+    def set_stage(self, stage):
+        """Record which step of the analysis is currently running"""
+        self.stage = stage
+        logging.debug(f"Job {self.id}: {stage}")
+
+    def update_progress(self, processed, total=None):
+        """Record rows processed so far; the first call starts the rate clock"""
+        if self.progress_started_at is None:
+            self.progress_started_at = time.time()
+        if total is not None:
+            self.rows_total = total
+        self.rows_processed = min(processed, self.rows_total or processed)
+
+    def rows_per_second(self):
+        if self.progress_started_at is None or not self.rows_processed:
+            return 0.0
+        end = self.finished_at or time.time()
+        elapsed = max(end - self.progress_started_at, 1e-9)
+        return self.rows_processed / elapsed
+
+    def eta_seconds(self):
+        if self.finished:
+            return 0.0
+        rate = self.rows_per_second()
+        if not rate or not self.rows_total:
+            return None
+        return max(self.rows_total - self.rows_processed, 0) / rate
+
+    def to_dict(self):
+        """JSON-serializable view used by the polling API"""
+        eta = self.eta_seconds()
+        return {
+            "id": self.id,
+            "description": self.description,
+            "state": self.state,
+            "stage": self.stage,
+            "rows_total": self.rows_total,
+            "rows_processed": self.rows_processed,
+            "rows_per_second": round(self.rows_per_second(), 1),
+            "eta_seconds": round(eta, 1) if eta is not None else None,
+            "elapsed_seconds": round(
+                (self.finished_at or time.time()) - (self.started_at or time.time()),
+                2,
+            ),
+            "error": self.error,
+            "run_id": (self.result or {}).get("run_id"),
+        }
+
+
+class JobManager:
+    """Runs analysis jobs on a worker pool and keeps recent jobs addressable by id"""
+
+    def __init__(self, max_workers=2, max_finished_jobs=20, on_finish=None):
+        self.max_finished_jobs = max_finished_jobs
+        # Called with each job once it has completed or failed
+        self.on_finish = on_finish
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="analysis"
+        )
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, description="", **kwargs):
+        """Queue ``fn(job, *args, **kwargs)`` and return the new job immediately
+
+        The function's return value becomes ``job.result``; an exception
+        marks the job failed with the exception message as its error.
+        """
+        job = AnalysisJob(uuid.uuid4().hex, description)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        job.state = RUNNING
+        job.started_at = time.time()
+        # finished_at is set before the terminal state is published, so
+        # readers never see a finished job without it
+        try:
+            job.result = fn(job, *args, **kwargs)
+            job.set_stage("done")
+            job.finished_at = time.time()
+            job.state = COMPLETED
+        except Exception as e:
+            logging.error(f"Job {job.id} failed: {e}")
+            job.error = str(e)
+            job.finished_at = time.time()
+            job.state = FAILED
+        finally:
+            if self.on_finish is not None:
+                try:
+                    self.on_finish(job)
+                except Exception as e:
+                    logging.warning(f"Job {job.id} finish hook failed: {e}")
+
+    def _prune(self):
+        """Forget the oldest finished jobs beyond the retention limit"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[: max(len(finished) - self.max_finished_jobs, 0)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def state_counts(self):
+        """Number of tracked jobs in each state"""
+        counts = {state: 0 for state in (QUEUED, RUNNING, COMPLETED, FAILED)}
+        with self._lock:
+            for job in self._jobs.values():
+                counts[job.state] += 1
+        return counts
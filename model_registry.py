@@ -0,0 +1,153 @@
+# Registry of sentiment models and a memory-bounded cache of loaded pipelines
+import gc
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+DEFAULT_MODEL_KEY = "roberta"
+DEFAULT_MODELS = {
+    "roberta": {
+        "model_id": "cardiffnlp/twitter-roberta-base-sentiment-latest",
+        "description": "RoBERTa base tuned on tweets (positive / neutral / negative)",
+    },
+    "distilbert": {
+        "model_id": "distilbert-base-uncased-finetuned-sst-2-english",
+        "description": "Distilled BERT tuned on SST-2 (positive / negative), lighter and faster",
+    },
+}
+
+DEFAULT_CACHE_BYTES = 2 * 1024**3
+# Assumed footprint of a pipeline whose size cannot be measured
+FALLBACK_MODEL_BYTES = 512 * 1024**2
+
+
+@dataclass(frozen=True)
+class ModelSpec:
+    """A selectable model: registry key, hub id and revision"""
+
+    key: str
+    model_id: str
+    revision: str = "main"
+    description: str = ""
+
+
+def load_registry(path=None, default_revision="main"):
+    """Return {key: ModelSpec} of the built-in models plus any from a JSON file
+
+    The optional file maps keys to ``{"model_id", "revision", "description"}``
+    objects; its entries override built-in ones with the same key.
+    """
+    entries = {key: dict(value) for key, value in DEFAULT_MODELS.items()}
+    entries[DEFAULT_MODEL_KEY]["revision"] = default_revision
+    if path:
+        with open(path, "r", encoding="utf-8") as fh:
+            for key, value in json.load(fh).items():
+                entries[key] = value
+
+    return {
+        key: ModelSpec(
+            key=key,
+            model_id=value["model_id"],
+            revision=value.get("revision", "main"),
+            description=value.get("description", ""),
+        )
+        for key, value in entries.items()
+    }
+
+
+def estimate_pipeline_bytes(pipe):
+    """Approximate the memory held by a loaded pipeline's weights"""
+    model = getattr(pipe, "model", None)
+    parameters = getattr(model, "parameters", None)
+    if callable(parameters):
+        try:
+            return sum(p.numel() * p.element_size() for p in parameters())
+        except Exception:
+            pass
+    model_path = getattr(pipe, "model_path", None)
+    if model_path and os.path.exists(model_path):
+        return os.path.getsize(model_path)
+    return FALLBACK_MODEL_BYTES
+
+
+class PipelineCache:
+    """Loaded pipelines kept in LRU order within a memory budget.
+
+    ``loader(model_id, revision, backend)`` is called on a miss. Once the
+    estimated size of all loaded pipelines exceeds ``max_bytes`` the least
+    recently used ones are dropped; the pipeline just requested is always
+    kept, even when it alone is over budget.
+    """
+
+    def __init__(self, loader, max_bytes=DEFAULT_CACHE_BYTES):
+        self.loader = loader
+        self.max_bytes = max_bytes
+        self._pipelines = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.RLock()
+        self.loads = 0
+        self.evictions = 0
+
+    def get(self, spec, backend="pytorch"):
+        """Return the pipeline for a model spec, loading it if needed"""
+        key = (spec.model_id, spec.revision, backend)
+        with self._lock:
+            if key in self._pipelines:
+                self._pipelines.move_to_end(key)
+                return self._pipelines[key]
+
+            logging.info(f"Loading {spec.model_id}@{spec.revision} ({backend})...")
+            pipe = self.loader(spec.model_id, spec.revision, backend)
+            self._pipelines[key] = pipe
+            self._sizes[key] = estimate_pipeline_bytes(pipe)
+            self.loads += 1
+            self._evict(keep=key)
+            return pipe
+
+    def peek(self, spec, backend="pytorch"):
+        """Return an already loaded pipeline without loading or reordering"""
+        with self._lock:
+            return self._pipelines.get((spec.model_id, spec.revision, backend))
+
+    def _evict(self, keep):
+        evicted = False
+        while sum(self._sizes.values()) > self.max_bytes and len(self._pipelines) > 1:
+            key = next(iter(self._pipelines))
+            if key == keep:
+                self._pipelines.move_to_end(key)
+                continue
+            del self._pipelines[key]
+            del self._sizes[key]
+            self.evictions += 1
+            evicted = True
+            logging.info(f"Evicted pipeline {key[0]}@{key[1]} ({key[2]})")
+        if evicted:
+            # Release the dropped weights now rather than at the next GC cycle
+            gc.collect()
+
+    def loaded(self):
+        """Describe the loaded pipelines, least recently used first"""
+        with self._lock:
+            return [
+                {
+                    "model_id": model_id,
+                    "revision": revision,
+                    "backend": backend,
+                    "bytes": self._sizes[(model_id, revision, backend)],
+                }
+                for model_id, revision, backend in self._pipelines
+            ]
+
+    def stats(self):
+        with self._lock:
+            used = sum(self._sizes.values())
+        return {
+            "loaded": len(self._pipelines),
+            "bytes": used,
+            "max_bytes": self.max_bytes,
+            "loads": self.loads,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,225 @@
+# Quantized ONNX Runtime backend for the sentiment model
+import argparse
+import logging
+import os
+import time
+
+import numpy as np
+
+ONNX_MODEL_DIR = os.environ.get("SENTIMENT_ONNX_DIR", os.path.join("models", "onnx"))
+ONNX_OPSET = 14
+
+
+def onnx_model_dir(model_id, revision="main", base_dir=ONNX_MODEL_DIR):
+    """Directory holding the exported model, tokenizer and config"""
+    return os.path.join(base_dir, model_id.replace("/", "--"), revision)
+
+
+def export_quantized_model(model_id, revision="main", base_dir=ONNX_MODEL_DIR):
+    """Export the model to ONNX and apply int8 dynamic quantization
+
+    The export happens once per model id and revision; later calls return the
+    existing quantized file.
+    """
+    output_dir = onnx_model_dir(model_id, revision, base_dir)
+    quantized_path = os.path.join(output_dir, "model-int8.onnx")
+    if os.path.exists(quantized_path):
+        return quantized_path
+
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    logging.info(f"Exporting {model_id}@{revision} to ONNX...")
+    os.makedirs(output_dir, exist_ok=True)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_id, revision=revision)
+    model = AutoModelForSequenceClassification.from_pretrained(
+        model_id, revision=revision
+    )
+    model.eval()
+
+    tokenizer.save_pretrained(output_dir)
+    model.config.save_pretrained(output_dir)
+
+    fp32_path = os.path.join(output_dir, "model.onnx")
+    dummy = tokenizer(["This class was great"], return_tensors="pt")
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (dummy["input_ids"], dummy["attention_mask"]),
+            fp32_path,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["logits"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "logits": {0: "batch"},
+            },
+            opset_version=ONNX_OPSET,
+        )
+
+    logging.info("Applying int8 dynamic quantization...")
+    quantize_dynamic(fp32_path, quantized_path, weight_type=QuantType.QInt8)
+    os.remove(fp32_path)
+    return quantized_path
+
+
+class OnnxSentimentPipeline:
+    """Drop-in replacement for the transformers sentiment pipeline on ONNX Runtime
+
+    Accepts a string or a list of strings and returns ``[{"label", "score"}]``
+    per input, matching the output of ``pipeline("sentiment-analysis")``.
+    """
+
+    def __init__(self, model_dir, model_path, num_threads=None):
+        import onnxruntime as ort
+        from transformers import AutoConfig, AutoTokenizer
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.config = AutoConfig.from_pretrained(model_dir)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(
+            model_path, options, providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+    @property
+    def model(self):
+        # Mirrors pipeline.model.config for callers that inspect the config
+        return self
+
+    def __call__(self, texts, batch_size=None, truncation=True, **kwargs):
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        batch_size = batch_size or len(texts) or 1
+
+        outputs = []
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start : start + batch_size]
+            encoded = self.tokenizer(
+                batch,
+                padding=True,
+                truncation=truncation,
+                max_length=self.tokenizer.model_max_length if truncation else None,
+                return_tensors="np",
+            )
+            feeds = {
+                name: value.astype(np.int64)
+                for name, value in encoded.items()
+                if name in self._input_names
+            }
+            (logits,) = self.session.run(["logits"], feeds)
+
+            # Softmax over classes, stabilized by subtracting the row max
+            exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+            probs = exp / exp.sum(axis=1, keepdims=True)
+            for row in probs:
+                label_id = int(row.argmax())
+                outputs.append(
+                    {
+                        "label": self.config.id2label[label_id],
+                        "score": float(row[label_id]),
+                    }
+                )
+
+        return outputs
+
+
+def load_onnx_pipeline(
+    model_id, revision="main", base_dir=ONNX_MODEL_DIR, num_threads=None
+):
+    """Export (once), quantize and load the model on ONNX Runtime"""
+    model_path = export_quantized_model(model_id, revision, base_dir)
+    return OnnxSentimentPipeline(
+        onnx_model_dir(model_id, revision, base_dir), model_path, num_threads
+    )
+
+
+def check_agreement(reference_pipe, candidate_pipe, texts, batch_size=32):
+    """Compare candidate labels and speed against a reference pipeline
+
+    Returns the label agreement rate, mean absolute confidence difference,
+    both wall-clock timings, the speedup, and per-label disagreement counts.
+    """
+    texts = [str(text) for text in texts]
+
+    start = time.perf_counter()
+    reference = reference_pipe(texts, batch_size=batch_size, truncation=True)
+    reference_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    candidate = candidate_pipe(texts, batch_size=batch_size, truncation=True)
+    candidate_seconds = time.perf_counter() - start
+
+    matches = 0
+    score_diffs = []
+    disagreements = {}
+    for ref, cand in zip(reference, candidate):
+        if ref["label"] == cand["label"]:
+            matches += 1
+            score_diffs.append(abs(ref["score"] - cand["score"]))
+        else:
+            key = f"{ref['label']}->{cand['label']}"
+            disagreements[key] = disagreements.get(key, 0) + 1
+
+    total = len(texts)
+    return {
+        "total": total,
+        "agreement": round(matches / total, 4) if total else 0.0,
+        "mean_score_diff": (
+            round(float(np.mean(score_diffs)), 4) if score_diffs else 0.0
+        ),
+        "reference_seconds": round(reference_seconds, 3),
+        "candidate_seconds": round(candidate_seconds, 3),
+        "speedup": (
+            round(reference_seconds / candidate_seconds, 2)
+            if candidate_seconds
+            else 0.0
+        ),
+        "disagreements": disagreements,
+    }
+
+
+def main():
+    """Report ONNX int8 vs PyTorch agreement and speed on a workbook column"""
+    import pandas as pd
+    from transformers.pipelines import pipeline
+
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("workbook", help="Excel file containing responses")
+    parser.add_argument("--column", default="Why satisfied text area")
+    parser.add_argument(
+        "--model", default="cardiffnlp/twitter-roberta-base-sentiment-latest"
+    )
+    parser.add_argument("--revision", default="main")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--limit", type=int, default=1000)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    df = pd.read_excel(args.workbook, usecols=[args.column])
+    texts = df[args.column].dropna().astype(str)
+    texts = texts[texts != ""].head(args.limit).tolist()
+
+    reference = pipeline("sentiment-analysis", model=args.model, revision=args.revision)
+    candidate = load_onnx_pipeline(args.model, args.revision)
+    report = check_agreement(reference, candidate, texts, args.batch_size)
+
+    print(f"Responses compared: {report['total']}")
+    print(f"Label agreement:    {report['agreement'] * 100:.2f}%")
+    print(f"Mean score diff:    {report['mean_score_diff']:.4f}")
+    print(f"PyTorch time:       {report['reference_seconds']:.2f}s")
+    print(f"ONNX int8 time:     {report['candidate_seconds']:.2f}s")
+    print(f"Speedup:            {report['speedup']:.2f}x")
+    for change, count in sorted(report["disagreements"].items()):
+        print(f"  {change}: {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+# Prediction cache for the sentiment pipeline
+import hashlib
+import logging
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+DEFAULT_MEMORY_ENTRIES = 50000
+DEFAULT_DISK_ENTRIES = 1000000
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text):
+    """Normalize a response so trivially different copies share a cache entry"""
+    text = unicodedata.normalize("NFC", str(text))
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def text_hash(text):
+    """Return the cache key hash for a response"""
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+def resolve_model_revision(pipe, default="main"):
+    """Return the commit hash a loaded pipeline was resolved to, if known"""
+    config = getattr(getattr(pipe, "model", None), "config", None)
+    return getattr(config, "_commit_hash", None) or default
+
+
+def hub_commit_hash(model_id, revision="main"):
+    """Commit hash ``revision`` of a hub model points to, from its config only
+
+    Returns None when it cannot be resolved (offline without a cached
+    config, or transformers is not installed).
+    """
+    try:
+        from transformers import AutoConfig
+
+        config = AutoConfig.from_pretrained(model_id, revision=revision)
+    except Exception as e:
+        logging.warning(f"Could not resolve {model_id}@{revision}: {e}")
+        return None
+    return getattr(config, "_commit_hash", None)
+
+
+def cache_revision(model_id, revision="main", backend="pytorch", pipe=None):
+    """Revision that keys a model's predictions in the cache
+
+    The commit hash ``pipe`` was resolved to or, without a loaded pipeline
+    (sharded inference), the one the hub config resolves to, so every mode
+    shares entries and a moved branch invalidates them. Quantized scores
+    differ slightly, so backends other than pytorch get their own entries.
+    """
+    resolved = resolve_model_revision(pipe, None) or hub_commit_hash(model_id, revision)
+    resolved = resolved or revision
+    if backend != "pytorch":
+        resolved = f"{resolved}+{backend}"
+    return resolved
+
+
+class PredictionCache:
+    """Two-level (in-process LRU + SQLite) cache of sentiment predictions.
+
+    Entries are keyed by model id, model revision and the hash of the
+    normalized response text, so switching models never returns stale labels.
+    """
+
+    def __init__(
+        self,
+        db_path,
+        model_id,
+        model_revision="main",
+        max_memory_entries=DEFAULT_MEMORY_ENTRIES,
+        max_disk_entries=DEFAULT_DISK_ENTRIES,
+    ):
+        self.db_path = db_path
+        self.model_id = model_id
+        self.model_revision = model_revision or "main"
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._init_table()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _init_table(self):
+        conn = self._connect()
+        try:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS prediction_cache (
+                    model_id TEXT NOT NULL,
+                    model_revision TEXT NOT NULL,
+                    text_hash TEXT NOT NULL,
+                    label TEXT NOT NULL,
+                    score REAL NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (model_id, model_revision, text_hash)
+                )
+            """
+            )
+            conn.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_prediction_cache_last_used
+                ON prediction_cache (last_used)
+            """
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _remember(self, key, prediction):
+        """Insert into the in-process LRU, evicting the oldest entries"""
+        with self._lock:
+            self._memory[key] = prediction
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def get_many(self, keys):
+        """Look up hashed keys, returning {key: (label, score)} for hits"""
+        found = {}
+        missing = []
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+                else:
+                    missing.append(key)
+        self.memory_hits += len(found)
+
+        if missing:
+            conn = self._connect()
+            try:
+                # Stay well below SQLite's bound-parameter limit
+                for start in range(0, len(missing), 500):
+                    chunk = missing[start : start + 500]
+                    placeholders = ",".join("?" * len(chunk))
+                    rows = conn.execute(
+                        f"""
+                        SELECT text_hash, label, score FROM prediction_cache
+                        WHERE model_id = ? AND model_revision = ?
+                          AND text_hash IN ({placeholders})
+                    """,
+                        (self.model_id, self.model_revision, *chunk),
+                    ).fetchall()
+                    for key, label, score in rows:
+                        found[key] = (label, score)
+                        self._remember(key, (label, score))
+                        self.disk_hits += 1
+
+                    hit_keys = [
+                        (time.time(), self.model_id, self.model_revision, row[0])
+                        for row in rows
+                    ]
+                    if hit_keys:
+                        conn.executemany(
+                            """
+                            UPDATE prediction_cache SET last_used = ?
+                            WHERE model_id = ? AND model_revision = ? AND text_hash = ?
+                        """,
+                            hit_keys,
+                        )
+                conn.commit()
+            except sqlite3.Error as e:
+                logging.warning(f"Prediction cache lookup failed: {e}")
+            finally:
+                conn.close()
+
+        self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items):
+        """Store {key: (label, score)} predictions in both cache levels"""
+        if not items:
+            return
+
+        for key, prediction in items.items():
+            self._remember(key, prediction)
+
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.executemany(
+                """
+                INSERT OR REPLACE INTO prediction_cache
+                    (model_id, model_revision, text_hash, label, score, last_used)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """,
+                [
+                    (self.model_id, self.model_revision, key, label, float(score), now)
+                    for key, (label, score) in items.items()
+                ],
+            )
+            self._evict(conn)
+            conn.commit()
+        except sqlite3.Error as e:
+            logging.warning(f"Prediction cache write failed: {e}")
+        finally:
+            conn.close()
+
+    def _evict(self, conn):
+        """Drop least recently used rows once the table exceeds its bound"""
+        (count,) = conn.execute("SELECT COUNT(*) FROM prediction_cache").fetchone()
+        excess = count - self.max_disk_entries
+        if excess > 0:
+            conn.execute(
+                """
+                DELETE FROM prediction_cache WHERE rowid IN (
+                    SELECT rowid FROM prediction_cache ORDER BY last_used LIMIT ?
+                )
+            """,
+                (excess,),
+            )
+
+    def predict(self, texts, score_fn):
+        """Return (label, score) per text, scoring only uncached unique texts
+
+        ``score_fn`` receives a list of texts and must return a list of
+        (label, score) tuples in the same order. ERROR predictions are
+        returned but never cached.
+        """
+        keys = [text_hash(text) for text in texts]
+        unique_keys = list(dict.fromkeys(keys))
+        cached = self.get_many(unique_keys)
+
+        # Repeats within the same run are served from the first occurrence
+        self.memory_hits += len(keys) - len(unique_keys)
+
+        # Score each distinct uncached text once
+        pending = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in pending:
+                pending[key] = text
+
+        if pending:
+            scored = score_fn(list(pending.values()))
+            fresh = dict(zip(pending.keys(), scored))
+            self.put_many(
+                {key: pred for key, pred in fresh.items() if pred[0] != "ERROR"}
+            )
+            cached.update(fresh)
+
+        return [cached[key] for key in keys]
+
+    def stats(self):
+        """Return hit/miss counters and current sizes"""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((lookups - self.misses) / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
@@ -0,0 +1,68 @@
+# Opt-in cProfile capture of analysis runs
+import cProfile
+import io
+import logging
+import os
+import pstats
+
+from flags import parse_flag
+
+PROFILE_SUFFIX = ".prof"
+REPORT_SUFFIX = ".txt"
+# Functions listed in the text report, by cumulative time
+REPORT_ROWS = 60
+
+
+def profiling_requested(value):
+    """True when a query, form or environment value asks for profiling"""
+    return parse_flag(value)
+
+
+def profile_path(folder, run_key):
+    """Path of the binary (pstats) profile stored for a run"""
+    return os.path.join(folder, f"{run_key}{PROFILE_SUFFIX}")
+
+
+def report_path(folder, run_key):
+    """Path of the plain-text hot spot report stored for a run"""
+    return os.path.join(folder, f"{run_key}{REPORT_SUFFIX}")
+
+
+def format_report(profiler, rows=REPORT_ROWS):
+    """Top functions by cumulative and by own time, as text"""
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out).strip_dirs()
+    out.write("Top functions by cumulative time\n\n")
+    stats.sort_stats("cumulative").print_stats(rows)
+    out.write("\nTop functions by own time\n\n")
+    stats.sort_stats("tottime").print_stats(rows)
+    return out.getvalue()
+
+
+def save_profile(profiler, folder, run_key):
+    """Write a run's profile (loadable with pstats or snakeviz) and text report
+
+    Returns the path of the binary profile.
+    """
+    os.makedirs(folder, exist_ok=True)
+    path = profile_path(folder, run_key)
+    profiler.dump_stats(path)
+    with open(report_path(folder, run_key), "w", encoding="utf-8") as fh:
+        fh.write(format_report(profiler))
+    logging.info(f"Profile for {run_key} saved to {path}")
+    return path
+
+
+def run_profiled(fn, *args, **kwargs):
+    """Call ``fn`` under cProfile; returns ``(result, profiler)``
+
+    On an exception the profiler is attached to it as ``profiler`` before
+    it propagates, so callers can still save what was captured.
+    """
+    profiler = cProfile.Profile()
+    try:
+        result = profiler.runcall(fn, *args, **kwargs)
+    except Exception as e:
+        e.profiler = profiler
+        raise
+    return result, profiler
@@ -0,0 +1,87 @@
+# Bounded store of finished analysis results
+import pickle
+import re
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Run ids, or job-<id> for results that were not saved to the database
+VALID_KEY = re.compile(r"[0-9]+|job-[0-9a-f]{32}")
+
+
+def is_valid_key(key):
+    """True for a run id or ``job-<32 hex digits>``; anything else in a
+    ``run_id`` or ``job_id`` parameter is rejected"""
+    return VALID_KEY.fullmatch(str(key)) is not None
+
+
+def estimate_size(result):
+    """Approximate the footprint of a result dict in bytes"""
+    return len(pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+class ResultStore:
+    """Results of finished analyses keyed by run, bounded by a byte budget.
+
+    Results hold only the insights and metadata the result pages read, never
+    response text, so they stay small. The least recently used ones are
+    dropped once the budget is exceeded; saved runs remain available from
+    history, which reads the database and the run's row file.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def put(self, key, result):
+        """Store a result under ``key``, evicting older entries as needed"""
+        key = str(key)
+        if not is_valid_key(key):
+            raise ValueError(f"Invalid result key: {key!r}")
+        size = estimate_size(result)
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = result
+            self._sizes[key] = size
+            self._bytes += size
+            # The newest entry is kept even if it alone exceeds the budget
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def get(self, key):
+        """Return the result stored under ``key``, or None if unknown"""
+        key = str(key)
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def discard(self, key):
+        """Forget a result"""
+        with self._lock:
+            self._drop(str(key))
+
+    def _drop(self, key):
+        if key in self._entries:
+            del self._entries[key]
+            self._bytes -= self._sizes.pop(key)
+
+    def stats(self):
+        """Return entry counts, memory use and evictions"""
+        with self._lock:
+            in_memory = len(self._entries)
+            used = self._bytes
+        return {
+            "in_memory": in_memory,
+            "bytes": used,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+        }
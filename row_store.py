@@ -0,0 +1,293 @@
+# Row-level results of each analysis run, stored as one Arrow file per run
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from prediction_cache import normalize_text, text_hash
+from sentiment_stats import present_responses, sentiment_columns
+
+ROWS_SUFFIX = ".arrow"
+
+# Column order of every run file; files written before incremental runs
+# have no row_hash column, and files from before multi-column runs have no
+# column column
+ROW_COLUMNS = (
+    "row_index",
+    "column",
+    "text_hash",
+    "row_hash",
+    "sentiment",
+    "confidence",
+    "length",
+)
+
+
+def rows_available():
+    """True when pyarrow is installed and run files can be written"""
+    try:
+        import pyarrow  # noqa: F401
+
+        return True
+    except ImportError:
+        return False
+
+
+def run_rows_path(folder, run_key):
+    """Path of the row file stored for a run"""
+    return os.path.join(folder, f"{run_key}{ROWS_SUFFIX}")
+
+
+def _present_texts(df, text_column):
+    texts = df[text_column] if text_column in df.columns else pd.Series(index=df.index)
+    return texts, present_responses(texts)
+
+
+def _key_text(value):
+    """A key column value as text, the same whether the sheet was read from
+    the workbook or its columnar cache: integral floats lose their ".0" and
+    missing values become empty"""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return ""
+    if isinstance(value, (float, np.floating)) and float(value).is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def row_hashes(df, text_column, key_columns=None, text_hashes=None):
+    """Identity hash of each row's text and key column values
+
+    Without key columns this is the text hash, so rows match by content
+    alone; with them, a row matches only when its keys and text both agree
+    (key values are normalized, see ``_key_text``).
+    Empty responses get None. Pass ``text_hashes`` to reuse already
+    computed text hashes.
+    """
+    texts, present = _present_texts(df, text_column)
+    if text_hashes is None:
+        text_hashes = [
+            text_hash(text) if keep else None
+            for text, keep in zip(texts, present.tolist())
+        ]
+    key_columns = [c for c in key_columns or [] if c in df.columns]
+    if not key_columns:
+        return list(text_hashes)
+
+    keys = (
+        [_key_text(value) for value in row]
+        for row in df[key_columns].itertuples(index=False, name=None)
+    )
+    return [
+        (
+            hashlib.sha256(
+                json.dumps([list(key), normalize_text(str(text))]).encode("utf-8")
+            ).hexdigest()
+            if digest is not None
+            else None
+        )
+        for key, text, digest in zip(keys, texts, text_hashes)
+    ]
+
+
+def _text_columns(text_columns):
+    if isinstance(text_columns, str):
+        return [text_columns]
+    return list(text_columns)
+
+
+def _row_table(df, text_column, labels, key_columns=None, hashes=None):
+    import pyarrow as pa
+
+    texts, present = _present_texts(df, text_column)
+    if hashes is not None and not key_columns:
+        # Without key columns the row hashes are the text hashes
+        text_hashes = list(hashes)
+    else:
+        text_hashes = [
+            text_hash(text) if keep else None
+            for text, keep in zip(texts, present.tolist())
+        ]
+    if hashes is None:
+        hashes = row_hashes(df, text_column, key_columns, text_hashes)
+    lengths = np.where(present, texts.fillna("").astype(str).str.len(), 0)
+
+    sentiment_column, confidence_column = labels
+
+    return pa.table(
+        {
+            "row_index": pa.array(np.asarray(df.index, dtype=np.int64)),
+            "column": pa.array([str(text_column)] * len(df), type=pa.string()),
+            "text_hash": pa.array(text_hashes, type=pa.string()),
+            "row_hash": pa.array(hashes, type=pa.string()),
+            "sentiment": pa.array(
+                df[sentiment_column].astype(str).tolist(), type=pa.string()
+            ),
+            "confidence": pa.array(
+                pd.to_numeric(df[confidence_column], errors="coerce").astype("float64"),
+                from_pandas=True,
+            ),
+            "length": pa.array(lengths.astype(np.int64)),
+        }
+    )
+
+
+class RunRowsWriter:
+    """Writes a run's row file chunk by chunk while the run is scored
+
+    Rows go to a temporary file in ``folder``; ``commit`` renames it to the
+    run's path once that is known, so readers never see a partial run.
+    Leaving the ``with`` block without committing removes the file.
+    """
+
+    def __init__(self, folder):
+        os.makedirs(folder, exist_ok=True)
+        self.temp_path = os.path.join(
+            folder, f".{os.getpid()}.{threading.get_ident()}{ROWS_SUFFIX}.tmp"
+        )
+        self._sink = None
+        self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.discard()
+
+    def write(self, df, text_columns, key_columns=None, hashes=None):
+        """Append the rows of one chunk (see ``write_run_rows``)"""
+        import pyarrow as pa
+
+        text_columns = _text_columns(text_columns)
+        for column, labels in zip(text_columns, sentiment_columns(text_columns)):
+            table = _row_table(
+                df, column, labels, key_columns, (hashes or {}).get(column)
+            )
+            if self._writer is None:
+                self._sink = pa.OSFile(self.temp_path, "wb")
+                self._writer = pa.ipc.new_file(self._sink, table.schema)
+            self._writer.write_table(table)
+
+    def commit(self, path, text_columns):
+        """Close the file and move it to ``path``"""
+        if self._writer is None:
+            # No rows: an empty file with the usual columns
+            self.write(_empty_frame(text_columns), text_columns)
+        self._close()
+        os.replace(self.temp_path, path)
+
+    def discard(self):
+        self._close()
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+    def _close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._sink.close()
+            self._writer = self._sink = None
+
+
+def _empty_frame(text_columns):
+    text_columns = _text_columns(text_columns)
+    output = [name for pair in sentiment_columns(text_columns) for name in pair]
+    return pd.DataFrame(columns=text_columns + output)
+
+
+def write_run_rows(path, df, text_columns, key_columns=None, hashes=None):
+    """Write the per-row output of a run (index, text column, text and row
+    hashes, label, confidence, length)
+
+    ``text_columns`` is the analyzed column or list of columns; each gets
+    one row per response, labelled from its output pair (see
+    ``sentiment_columns``). Row hashes cover ``key_columns`` as well as the
+    text (see ``row_hashes``); pass ``hashes``, a dict of hashes per column,
+    when they were already computed. The file is written under a temporary
+    name and renamed into place, so readers never see a partial run.
+    """
+    with RunRowsWriter(os.path.dirname(path) or ".") as writer:
+        writer.write(df, text_columns, key_columns, hashes)
+        writer.commit(path, text_columns)
+
+
+def run_text_columns(path):
+    """Text columns analyzed in a run's file, in order; empty for files from
+    before multi-column runs, which hold a single column"""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    if "column" not in table.column_names:
+        return []
+    return pc.unique(table["column"]).to_pylist()
+
+
+def read_run_rows(
+    path,
+    columns=None,
+    sentiments=None,
+    min_confidence=None,
+    max_confidence=None,
+    text_column=None,
+):
+    """Load a run's rows as a DataFrame, optionally filtered
+
+    ``text_column`` keeps only the rows of one analyzed column; files from
+    before multi-column runs hold a single column and are not filtered. The
+    file is memory-mapped and filters are applied in Arrow before
+    conversion, so only matching rows of the requested columns are copied.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+
+    mask = None
+    if text_column is not None and "column" in table.column_names:
+        mask = pc.equal(table["column"], text_column)
+    if sentiments:
+        condition = pc.is_in(table["sentiment"], value_set=pa.array(list(sentiments)))
+        mask = condition if mask is None else pc.and_(mask, condition)
+    if min_confidence is not None:
+        condition = pc.greater_equal(table["confidence"], min_confidence)
+        mask = condition if mask is None else pc.and_(mask, condition)
+    if max_confidence is not None:
+        condition = pc.less_equal(table["confidence"], max_confidence)
+        mask = condition if mask is None else pc.and_(mask, condition)
+    if mask is not None:
+        table = table.filter(mask)
+
+    if columns is not None:
+        table = table.select(list(columns))
+    return table.to_pandas()
+
+
+def load_prior_predictions(path, key_columns=None, text_column=None):
+    """Map row hash -> (sentiment, confidence) from an earlier run's file
+
+    ``text_column`` selects one analyzed column of a multi-column run.
+    Files from before row hashes were stored fall back to their text hash,
+    which is the row hash of a run without key columns.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    if text_column is not None and "column" in table.column_names:
+        table = table.filter(pc.equal(table["column"], text_column))
+    if "row_hash" in table.column_names:
+        hash_column = "row_hash"
+    elif not key_columns:
+        hash_column = "text_hash"
+    else:
+        return {}
+
+    table = table.select([hash_column, "sentiment", "confidence"])
+    hashes, sentiments, confidences = (table.column(i).to_pylist() for i in range(3))
+    return {
+        digest: (sentiment, confidence)
+        for digest, sentiment, confidence in zip(hashes, sentiments, confidences)
+        if digest is not None and sentiment != "ERROR"
+    }
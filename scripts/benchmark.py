@@ -0,0 +1,445 @@
+# Reproducible performance benchmark on synthetic CSAT workbooks
+import argparse
+import json
+import logging
+import math
+import os
+import platform
+import random
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import pandas as pd
+
+# Allow importing shared modules from the project root
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from excel_io import read_excel_columns, write_results_workbook
+from inference import new_window_stats, window_overhead
+from row_store import ROWS_SUFFIX, rows_available, write_run_rows
+from sentiment_stats import compute_frame_stats
+from timing import StageTimer
+
+TEXT_COLUMN = "Why satisfied text area"
+PIPELINE_TEXT_COLUMN = "Response"  # column read by scripts/sentiment_pipeline.py
+TARGETS = ("app", "pipeline")
+
+# Word counts are log-normal: (median words, sigma). "mixed" has a tail of
+# responses longer than the model context, "long" is mostly over it.
+LENGTH_PROFILES = {
+    "short": (12, 0.6),
+    "mixed": (40, 1.0),
+    "long": (350, 0.5),
+}
+BLANK_RATE = 0.05
+CANNED_RATE = 0.10
+CANNED_RESPONSES = ["N/A", "Great class!", "Nothing", "Good", "No comment", "Fine"]
+
+SENTENCES = {
+    "positive": [
+        "The instructor explained every concept clearly and patiently.",
+        "I really enjoyed the weekly discussions with my classmates.",
+        "Feedback on assignments was quick, specific and helpful.",
+        "The course materials were well organized and easy to follow.",
+        "This class helped me grow more than I expected.",
+        "Office hours were welcoming and genuinely useful.",
+    ],
+    "negative": [
+        "The assignments felt disconnected from the lectures.",
+        "Grading was slow and the rubric was confusing.",
+        "I struggled to find the readings in the course site.",
+        "The workload was far heavier than the credit hours suggest.",
+        "Several deadlines changed without any notice.",
+        "The videos were hard to hear and often out of date.",
+    ],
+    "neutral": [
+        "The course covered the topics listed in the syllabus.",
+        "We met twice a week and had a quiz most Fridays.",
+        "Most of the work was done in small groups.",
+        "The textbook was available from the library.",
+        "I took this class to fulfil a general education requirement.",
+        "Lectures were recorded and posted afterwards.",
+    ],
+}
+COURSES = ["ACCTG 201", "BIO 180", "CS 124", "ENG 150", "MATH 112", "REL 250"]
+
+# Words the stub model treats as sentiment cues
+POSITIVE_WORDS = {"clearly", "enjoyed", "helpful", "organized", "grow", "useful"}
+NEGATIVE_WORDS = {"disconnected", "confusing", "struggled", "heavier", "hard"}
+STUB_MAX_TOKENS = 512
+
+
+def synthetic_response(rng, median_words, sigma):
+    """One free-text CSAT answer whose word count follows the profile"""
+    roll = rng.random()
+    if roll < BLANK_RATE:
+        return None
+    if roll < BLANK_RATE + CANNED_RATE:
+        return rng.choice(CANNED_RESPONSES)
+
+    target = max(3, int(rng.lognormvariate(math.log(median_words), sigma)))
+    mood = rng.choice(list(SENTENCES))
+    words = 0
+    sentences = []
+    while words < target:
+        # Mostly on-mood sentences with some mixed feelings
+        pool = (
+            SENTENCES[mood]
+            if rng.random() < 0.7
+            else rng.choice(list(SENTENCES.values()))
+        )
+        sentence = rng.choice(pool)
+        sentences.append(sentence)
+        words += len(sentence.split())
+    return " ".join(sentences)
+
+
+def generate_workbook(path, rows, profile="mixed", seed=0, text_column=TEXT_COLUMN):
+    """Write a synthetic CSAT survey export and return its DataFrame
+
+    The same ``rows``, ``profile`` and ``seed`` always produce the same
+    workbook, so timings are comparable across commits.
+    """
+    median_words, sigma = LENGTH_PROFILES[profile]
+    rng = random.Random(f"{seed}-{rows}-{profile}")
+    df = pd.DataFrame(
+        {
+            "Response ID": range(1, rows + 1),
+            "Course": [rng.choice(COURSES) for _ in range(rows)],
+            "Overall Satisfaction": [rng.randint(1, 5) for _ in range(rows)],
+            text_column: [
+                synthetic_response(rng, median_words, sigma) for _ in range(rows)
+            ],
+        }
+    )
+    df.to_excel(path, index=False)
+    return df
+
+
+class _StubTokenizer:
+    """Whitespace tokenizer with the parts of the transformers API we use"""
+
+    model_max_length = STUB_MAX_TOKENS
+
+    def num_special_tokens_to_add(self, pair=False):
+        return 2
+
+    def __call__(
+        self, texts, add_special_tokens=True, return_offsets_mapping=False, **kwargs
+    ):
+        single = isinstance(texts, str)
+        ids, offsets = [], []
+        for text in [texts] if single else texts:
+            spans = [match.span() for match in re.finditer(r"\S+", text)]
+            tokens = list(range(3, len(spans) + 3))
+            ids.append([0] + tokens + [2] if add_special_tokens else tokens)
+            offsets.append(spans)
+        encoded = {"input_ids": ids[0] if single else ids}
+        if return_offsets_mapping:
+            encoded["offset_mapping"] = offsets[0] if single else offsets
+        return encoded
+
+
+class StubSentimentPipeline:
+    """Deterministic keyword model standing in for the transformer offline
+
+    Scoring sleeps ``token_seconds`` per padded token of each batch, so
+    batching and padding behave roughly as they do on a real model.
+    """
+
+    def __init__(self, token_seconds=0.0):
+        self.tokenizer = _StubTokenizer()
+        self.token_seconds = token_seconds
+
+    def _score(self, text):
+        words = [word.strip(".,!?").lower() for word in text.split()]
+        positive = sum(word in POSITIVE_WORDS for word in words)
+        negative = sum(word in NEGATIVE_WORDS for word in words)
+        if positive == negative:
+            return {"label": "neutral", "score": 0.55}
+        label = "positive" if positive > negative else "negative"
+        margin = abs(positive - negative) / (positive + negative)
+        return {"label": label, "score": round(0.5 + margin / 2, 4)}
+
+    def __call__(self, texts, batch_size=None, truncation=True, **kwargs):
+        single = isinstance(texts, str)
+        batch = [texts] if single else list(texts)
+        if self.token_seconds:
+            longest = max(len(text.split()) for text in batch) + 2
+            time.sleep(self.token_seconds * min(longest, STUB_MAX_TOKENS) * len(batch))
+        results = [self._score(text) for text in batch]
+        return [results[0]] if single else results
+
+
+def git_commit():
+    """Short commit hash of the working tree, or None outside a git checkout"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=PROJECT_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_app(workbook, workdir, batch_size, loader=None):
+    """Run the web app's analysis stages on a workbook; returns (timer, extras)"""
+    import app as webapp
+
+    if loader is not None:
+        webapp.pipeline_cache.loader = loader
+    webapp.init_database()
+    # Start every repetition with an empty prediction cache
+    webapp.prediction_caches.clear()
+    webapp.PREDICTION_CACHE_FILE = os.path.join(workdir, "prediction_cache.db")
+    if os.path.exists(webapp.PREDICTION_CACHE_FILE):
+        os.remove(webapp.PREDICTION_CACHE_FILE)
+
+    timer = StageTimer()
+    with timer.stage("model_load"):
+        pipe, _cache = webapp.load_sentiment_model()
+    if pipe is None:
+        raise RuntimeError("Error loading sentiment analysis model")
+
+    window_stats = new_window_stats()
+    with timer.stage("read"):
+        df = read_excel_columns(workbook, [TEXT_COLUMN])
+    with timer.stage("inference"):
+        df, error = webapp.analyze_sentiment(
+            df, TEXT_COLUMN, batch_size, window_stats=window_stats
+        )
+    if error:
+        raise RuntimeError(error)
+    with timer.stage("insights"):
+        stats = compute_frame_stats(df, TEXT_COLUMN)
+        insights = stats.insights(TEXT_COLUMN, [TEXT_COLUMN])
+        aggregates = stats.chart_aggregates()
+    with timer.stage("visualizations"):
+        webapp.create_visualizations(aggregates)
+    if rows_available():
+        # Row hashes are computed along with the file, as run_analysis does
+        with timer.stage("row_store"):
+            write_run_rows(
+                os.path.join(workdir, f"run{ROWS_SUFFIX}"), df, [TEXT_COLUMN]
+            )
+    result_path = os.path.join(workdir, "analyzed.xlsx")
+    with timer.stage("export"):
+        write_results_workbook(
+            workbook,
+            result_path,
+            {
+                "Sentiment": df["Sentiment"].tolist(),
+                "Confidence": df["Confidence"].tolist(),
+            },
+        )
+    with timer.stage("db"):
+        webapp.save_analysis_to_db(
+            os.path.basename(workbook),
+            os.path.basename(result_path),
+            insights,
+            timer.total,
+            aggregates,
+        )
+    return timer, {"windowing": window_overhead(window_stats)}
+
+
+def bench_pipeline(workbook, workdir, loader=None):
+    """Run scripts/sentiment_pipeline.analyze_sentiment on a workbook"""
+    import sentiment_pipeline
+
+    if loader is not None:
+        sentiment_pipeline.load_pipeline = loader
+
+    # The script reads responses.xlsx and writes its cache in the working directory
+    rundir = tempfile.mkdtemp(dir=workdir)
+    shutil.copy(workbook, os.path.join(rundir, "responses.xlsx"))
+    previous = os.getcwd()
+    os.chdir(rundir)
+    try:
+        timer = StageTimer()
+        if sentiment_pipeline.analyze_sentiment(timer) is None:
+            raise RuntimeError("scripts/sentiment_pipeline.py analysis failed")
+    finally:
+        os.chdir(previous)
+        shutil.rmtree(rundir, ignore_errors=True)
+    return timer, {}
+
+
+def summarize(records):
+    """Median stage timings per (target, profile, rows) across repetitions"""
+    groups = {}
+    for record in records:
+        key = (record["target"], record["profile"], record["rows"])
+        groups.setdefault(key, []).append(record)
+
+    summary = []
+    for (target, profile, rows), runs in groups.items():
+        stages = {}
+        for run in runs:
+            for stage, seconds in run["stages"].items():
+                stages.setdefault(stage, []).append(seconds)
+        medians = {stage: round(statistics.median(v), 4) for stage, v in stages.items()}
+        total = statistics.median(run["total_seconds"] for run in runs)
+        summary.append(
+            {
+                "target": target,
+                "profile": profile,
+                "rows": rows,
+                "repeats": len(runs),
+                "stages": medians,
+                "total_seconds": round(total, 4),
+                "rows_per_second": round(rows / max(total, 1e-9), 1),
+            }
+        )
+    return summary
+
+
+def compare(summary, baseline_path):
+    """Print each stage's median against a previous benchmark file"""
+    with open(baseline_path, "r", encoding="utf-8") as fh:
+        baseline = {
+            (s["target"], s["profile"], s["rows"]): s for s in json.load(fh)["summary"]
+        }
+    for current in summary:
+        key = (current["target"], current["profile"], current["rows"])
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        print(f"\n{key[0]} / {key[1]} / {key[2]} rows (baseline -> current)")
+        stages = dict(current["stages"], total=current["total_seconds"])
+        old_stages = dict(previous["stages"], total=previous["total_seconds"])
+        for stage, seconds in stages.items():
+            if stage not in old_stages:
+                continue
+            old = old_stages[stage]
+            change = (seconds - old) / old * 100 if old else 0.0
+            print(f"  {stage:<12} {old:>9.4f}s -> {seconds:>9.4f}s  ({change:+.1f}%)")
+
+
+def main():
+    """Time each analysis stage on synthetic CSAT workbooks and write JSON results"""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument(
+        "--profile", nargs="+", choices=sorted(LENGTH_PROFILES), default=["mixed"]
+    )
+    parser.add_argument("--target", nargs="+", choices=TARGETS, default=list(TARGETS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument(
+        "--stub",
+        action="store_true",
+        help="Use a keyword stub instead of the transformer (runs offline)",
+    )
+    parser.add_argument(
+        "--stub-token-us",
+        type=float,
+        default=0.0,
+        help="Simulated stub cost in microseconds per padded token",
+    )
+    parser.add_argument("--output", help="JSON file for the results")
+    parser.add_argument("--compare", help="Earlier JSON results to compare against")
+    parser.add_argument("--keep", action="store_true", help="Keep generated files")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    sys.path.insert(0, os.path.join(PROJECT_ROOT, "scripts"))
+    output = os.path.abspath(
+        args.output or f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+
+    loader = None
+    if args.stub:
+        stub = StubSentimentPipeline(args.stub_token_us / 1e6)
+        loader = lambda *_args, **_kwargs: stub
+
+    workdir = tempfile.mkdtemp(prefix="sentiment_bench_")
+    previous = os.getcwd()
+    # The app creates its folders and database relative to the working directory
+    os.chdir(workdir)
+    records = []
+    try:
+        for profile in args.profile:
+            for rows in args.rows:
+                workbooks = {}
+                for target in args.target:
+                    column = TEXT_COLUMN if target == "app" else PIPELINE_TEXT_COLUMN
+                    path = os.path.join(workdir, f"csat_{profile}_{rows}_{target}.xlsx")
+                    generate_workbook(path, rows, profile, args.seed, column)
+                    workbooks[target] = path
+
+                for target in args.target:
+                    for repeat in range(args.repeat):
+                        if target == "app":
+                            timer, extras = bench_app(
+                                workbooks[target], workdir, args.batch_size, loader
+                            )
+                        else:
+                            timer, extras = bench_pipeline(
+                                workbooks[target], workdir, loader
+                            )
+                        # Model loading is reported but not counted in the total
+                        stages = timer.as_dict()
+                        total = timer.total - timer.stages.get("model_load", 0.0)
+                        records.append(
+                            dict(
+                                target=target,
+                                profile=profile,
+                                rows=rows,
+                                repeat=repeat,
+                                stages=stages,
+                                total_seconds=round(total, 4),
+                                rows_per_second=round(rows / max(total, 1e-9), 1),
+                                **extras,
+                            )
+                        )
+                        print(
+                            f"{target:<8} {profile:<6} {rows:>7} rows  #{repeat + 1}: "
+                            f"{total:.3f}s  {stages}"
+                        )
+    finally:
+        os.chdir(previous)
+        if args.keep:
+            print(f"Generated files kept in {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "model": (
+                "stub" if args.stub else os.environ.get("SENTIMENT_MODEL", "default")
+            ),
+            "backend": os.environ.get("SENTIMENT_BACKEND", "pytorch"),
+            "batch_size": args.batch_size,
+            "seed": args.seed,
+            "repeat": args.repeat,
+        },
+        "summary": summarize(records),
+        "runs": records,
+    }
+    with open(output, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        compare(report["summary"], args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,6 @@
 # Sentiment Data Analysis and Visualization
+import os
+import sys
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
@@ -8,22 +10,34 @@ import warnings
 
 warnings.filterwarnings("ignore")
 
+# Allow importing shared modules from the project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from excel_io import read_excel_columns
+from sentiment_stats import compute_frame_stats, response_lengths
+
 # Set style for better-looking plots
 plt.style.use("seaborn-v0_8")
 sns.set_palette("husl")
 
 
 class SentimentAnalyzer:
-    def __init__(self, file_path="clean_sentiment.xlsx"):
-        """Initialize the analyzer with the cleaned sentiment data."""
+    def __init__(self, file_path="clean_sentiment.xlsx", columns=None):
+        """Initialize the analyzer with the cleaned sentiment data.
+
+        Pass ``columns`` to stream only those columns from the workbook
+        instead of loading every column.
+        """
         self.file_path = file_path
+        self.columns = columns
         self.df = None
+        self._stats = None
         self.load_data()
 
     def load_data(self):
         """Load and prepare the sentiment data."""
         try:
-            self.df = pd.read_excel(self.file_path)
+            self.df = read_excel_columns(self.file_path, self.columns)
             print(
                 f"✅ Successfully loaded {len(self.df)} responses from {self.file_path}"
             )
@@ -35,6 +49,13 @@ class SentimentAnalyzer:
             print(f"❌ Error loading data: {e}")
             return None
 
+    @property
+    def stats(self):
+        """Statistics of the loaded data, computed once in a single pass."""
+        if self._stats is None and self.df is not None:
+            self._stats = compute_frame_stats(self.df, "Response")
+        return self._stats
+
     def basic_statistics(self):
         """Generate basic statistics about the sentiment data."""
         if self.df is None:
@@ -50,18 +71,17 @@ class SentimentAnalyzer:
 
         # Sentiment distribution
         if "Sentiment" in self.df.columns:
-            sentiment_counts = self.df["Sentiment"].value_counts()
             print(f"\n📊 Sentiment Distribution:")
-            for sentiment, count in sentiment_counts.items():
-                percentage = (count / len(self.df)) * 100
+            for sentiment, count in self.stats.sentiment_counts.items():
+                percentage = self.stats.percentage(count)
                 print(f"  {sentiment}: {count} ({percentage:.1f}%)")
 
         # Confidence statistics
-        if "Confidence" in self.df.columns:
-            conf_stats = self.df["Confidence"].describe()
+        if self.stats.confidence is not None:
+            conf_stats = self.stats.confidence
             print(f"\n🎯 Confidence Score Statistics:")
             print(f"  Mean: {conf_stats['mean']:.3f}")
-            print(f"  Median: {conf_stats['50%']:.3f}")
+            print(f"  Median: {conf_stats['median']:.3f}")
             print(f"  Min: {conf_stats['min']:.3f}")
             print(f"  Max: {conf_stats['max']:.3f}")
             print(f"  Std Dev: {conf_stats['std']:.3f}")
@@ -187,7 +207,8 @@ class SentimentAnalyzer:
 
         # 3. Confidence vs Response Length (if Response column exists)
         if "Response" in self.df.columns:
-            self.df["Response_Length"] = self.df["Response"].astype(str).str.len()
+            # Same lengths as the statistics, so empty responses plot at 0
+            self.df["Response_Length"] = response_lengths(self.df["Response"])
             ax3.scatter(
                 self.df["Response_Length"],
                 self.df["Confidence"],
@@ -200,21 +221,14 @@ class SentimentAnalyzer:
             ax3.grid(alpha=0.3)
 
         # 4. High vs Low Confidence Distribution
-        high_conf = self.df[self.df["Confidence"] >= 0.8]
-        low_conf = self.df[self.df["Confidence"] < 0.5]
+        levels = self.stats.confidence_levels
 
         categories = [
             "High Confidence\n(≥0.8)",
             "Medium Confidence\n(0.5-0.8)",
             "Low Confidence\n(<0.5)",
         ]
-        counts = [
-            len(high_conf),
-            len(
-                self.df[(self.df["Confidence"] >= 0.5) & (self.df["Confidence"] < 0.8)]
-            ),
-            len(low_conf),
-        ]
+        counts = [levels["high"], levels["medium"], levels["low"]]
 
         bars = ax4.bar(categories, counts, color=["green", "orange", "red"], alpha=0.7)
         ax4.set_title("Confidence Level Distribution", fontweight="bold")
@@ -292,51 +306,45 @@ class SentimentAnalyzer:
         print("💡 KEY INSIGHTS")
         print("=" * 50)
 
-        # Most common sentiment
-        if "Sentiment" in self.df.columns:
-            most_common = self.df["Sentiment"].mode()[0]
-            most_common_pct = (
-                self.df["Sentiment"].value_counts()[most_common] / len(self.df)
-            ) * 100
-            print(f"🏆 Most common sentiment: {most_common} ({most_common_pct:.1f}%)")
-
-        # Confidence insights
-        if "Confidence" in self.df.columns:
-            avg_confidence = self.df["Confidence"].mean()
-            high_conf_count = len(self.df[self.df["Confidence"] >= 0.8])
-            high_conf_pct = (high_conf_count / len(self.df)) * 100
+        insights = self.stats.insights("Response")
 
-            print(f"📊 Average confidence score: {avg_confidence:.3f}")
+        # Most common sentiment
+        if "most_common_sentiment" in insights:
+            most_common = insights["most_common_sentiment"]
             print(
-                f"🎯 High confidence predictions (≥0.8): {high_conf_count} ({high_conf_pct:.1f}%)"
+                f"🏆 Most common sentiment: {most_common['sentiment']} ({most_common['percentage']:.1f}%)"
             )
 
-            # Most confident sentiment
-            conf_by_sentiment = (
-                self.df.groupby("Sentiment")["Confidence"]
-                .mean()
-                .sort_values(ascending=False)
+        # Confidence insights
+        if "confidence_stats" in insights:
+            high_conf = insights["high_confidence"]
+            print(
+                f"📊 Average confidence score: {insights['confidence_stats']['mean']:.3f}"
             )
             print(
-                f"🔥 Most confident sentiment: {conf_by_sentiment.index[0]} (avg: {conf_by_sentiment.iloc[0]:.3f})"
+                f"🎯 High confidence predictions (≥0.8): {high_conf['count']} ({high_conf['percentage']:.1f}%)"
             )
 
-        # Response length insights (if available)
-        if "Response" in self.df.columns:
-            self.df["Response_Length"] = self.df["Response"].astype(str).str.len()
-            avg_length = self.df["Response_Length"].mean()
-            print(f"📝 Average response length: {avg_length:.0f} characters")
+            # Most confident sentiment
+            if "most_confident_sentiment" in insights:
+                most_confident = insights["most_confident_sentiment"]
+                print(
+                    f"🔥 Most confident sentiment: {most_confident['sentiment']} (avg: {most_confident['avg_confidence']:.3f})"
+                )
 
-            # Length by sentiment
-            length_by_sentiment = (
-                self.df.groupby("Sentiment")["Response_Length"]
-                .mean()
-                .sort_values(ascending=False)
-            )
+        # Response length insights (if available)
+        if "avg_response_length" in insights:
             print(
-                f"📏 Longest responses on average: {length_by_sentiment.index[0]} ({length_by_sentiment.iloc[0]:.0f} chars)"
+                f"📝 Average response length: {insights['avg_response_length']:.0f} characters"
             )
 
+            # Length by sentiment
+            if "longest_responses_sentiment" in insights:
+                longest = insights["longest_responses_sentiment"]
+                print(
+                    f"📏 Longest responses on average: {longest['sentiment']} ({longest['avg_length']:.0f} chars)"
+                )
+
     def export_summary_report(self):
         """Export a summary report to Excel."""
         if self.df is None:
@@ -1,31 +1,78 @@
 # Sentiment Analysis Pipeline using RoBERTa
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
 import pandas as pd
-from transformers.pipelines import pipeline
 import logging
 
+# Allow importing shared modules from the project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inference import (
+    load_pipeline,
+    new_window_stats,
+    predict_batched,
+    ShardedPredictor,
+    window_overhead,
+)
+from model_registry import DEFAULT_MODEL_KEY, load_registry
+from prediction_cache import PredictionCache, cache_revision
+from profiling import profiling_requested, run_profiled, save_profile
+from sentiment_stats import present_responses
+from timing import StageTimer
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Model chosen from the same registry as the web app (SENTIMENT_MODEL key)
+MODEL_SPEC = load_registry(
+    os.environ.get("SENTIMENT_MODEL_REGISTRY"),
+    default_revision=os.environ.get("SENTIMENT_MODEL_REVISION", "main"),
+)[os.environ.get("SENTIMENT_MODEL", DEFAULT_MODEL_KEY)]
+MODEL_ID = MODEL_SPEC.model_id
+MODEL_REVISION = MODEL_SPEC.revision
+PREDICTION_CACHE_FILE = "prediction_cache.db"
+BATCH_SIZE = int(os.environ.get("SENTIMENT_BATCH_SIZE", "32"))
+INFERENCE_WORKERS = int(os.environ.get("SENTIMENT_INFERENCE_WORKERS", "1"))
+PROFILE_FOLDER = os.path.join("results", "profiles")
+
+
+def analyze_sentiment(timer=None, profile=None):
+    """
+    Run the analysis, optionally under cProfile.
 
-def analyze_sentiment():
+    Profiling is enabled by ``profile=True`` or the SENTIMENT_PROFILE
+    environment variable; the profile and a text report of hot spots are
+    written to results/profiles/.
+    """
+    if profile is None:
+        profile = profiling_requested(os.environ.get("SENTIMENT_PROFILE"))
+    if not profile:
+        return _analyze_sentiment(timer)
+
+    result, profiler = run_profiled(_analyze_sentiment, timer)
+    run_key = f"pipeline_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    path = save_profile(profiler, PROFILE_FOLDER, run_key)
+    logger.info(f"Profile saved to {path}")
+    return result
+
+
+def _analyze_sentiment(timer=None):
     """
     Analyze sentiment from responses.xlsx and save results back to the file.
     Reads from 'Response' column and saves sentiment results to 'Sentiment' column.
+    Stage durations are recorded in ``timer`` (a ``StageTimer``) when given.
     """
+    timer = timer or StageTimer()
 
     try:
-        # Load the sentiment analysis pipeline using a proper sentiment model
-        logger.info("Loading sentiment analysis model...")
-        pipe = pipeline(
-            "sentiment-analysis",
-            model="cardiffnlp/twitter-roberta-base-sentiment-latest",
-        )
-        logger.info("Model loaded successfully!")
-
         # Read the Excel file
         logger.info("Reading responses.xlsx...")
-        df = pd.read_excel("responses.xlsx")
+        with timer.stage("read"):
+            df = pd.read_excel("responses.xlsx")
 
         # Check if required column exists
         if "Response" not in df.columns:
@@ -40,51 +87,64 @@ def analyze_sentiment():
             df["Sentiment"] = None
             df["Confidence"] = None
 
-        # Analyze sentiment for each response
-        sentiments = []
-        confidences = []
+        # Analyze sentiment for each non-empty response
+        sentiments = ["UNKNOWN"] * len(df)
+        confidences = [0.0] * len(df)
 
-        for idx, response in enumerate(df["Response"]):
-            if pd.isna(response) or response == "":
-                sentiments.append("UNKNOWN")
-                confidences.append(0.0)
+        row_indices = []
+        texts = []
+        present = present_responses(df["Response"]).tolist()
+        for idx, (response, keep) in enumerate(zip(df["Response"], present)):
+            if not keep:
                 continue
+            row_indices.append(idx)
+            texts.append(str(response))
+
+        # Shard across worker processes when parallel mode is enabled; long
+        # responses are scored in overlapping windows either way
+        window_stats = new_window_stats()
+        if INFERENCE_WORKERS > 1:
+            # Each worker loads its own copy, so the parent never loads one;
+            # the cache is keyed by the commit the hub config resolves to
+            predictor = ShardedPredictor(INFERENCE_WORKERS, MODEL_ID, MODEL_REVISION)
+            revision = cache_revision(MODEL_ID, MODEL_REVISION)
+            score_texts = lambda batch: predictor.predict(
+                batch, BATCH_SIZE, window_stats=window_stats
+            )
+        else:
+            # Load the sentiment analysis pipeline using a proper sentiment model
+            logger.info("Loading sentiment analysis model...")
+            with timer.stage("model_load"):
+                pipe = load_pipeline(MODEL_ID, MODEL_REVISION)
+            logger.info("Model loaded successfully!")
+            predictor = None
+            revision = cache_revision(MODEL_ID, MODEL_REVISION, pipe=pipe)
+            score_texts = lambda batch: predict_batched(
+                pipe, batch, BATCH_SIZE, window_stats=window_stats
+            )
+
+        # Repeated and previously seen responses are served from the cache
+        cache = PredictionCache(PREDICTION_CACHE_FILE, MODEL_ID, revision)
+        start_time = time.perf_counter()
+        try:
+            with timer.stage("inference"):
+                predictions = cache.predict(texts, score_texts)
+        finally:
+            if predictor is not None:
+                predictor.close()
+        elapsed = time.perf_counter() - start_time
+        logger.info(f"Prediction cache: {cache.stats()}")
+        logger.info(
+            f"Scored {len(texts)} responses in {elapsed:.2f}s "
+            f"({len(texts) / max(elapsed, 1e-9):.1f} rows/sec, "
+            f"{INFERENCE_WORKERS} worker(s))"
+        )
+        if window_stats["long_texts"]:
+            logger.info(f"Windowing overhead: {window_overhead(window_stats)}")
 
-            try:
-                # Get sentiment prediction
-                result = pipe(str(response))
-
-                # Handle the pipeline result which is typically a list of dicts
-                if isinstance(result, list) and len(result) > 0:
-                    prediction = result[0]
-                elif hasattr(result, "__iter__"):
-                    # Convert iterator/generator to list
-                    result_list = list(result)
-                    prediction = result_list[0] if result_list else {}
-                else:
-                    prediction = result if isinstance(result, dict) else {}
-
-                # Extract sentiment and confidence with fallbacks
-                sentiment = (
-                    prediction.get("label", "UNKNOWN")
-                    if isinstance(prediction, dict)
-                    else "UNKNOWN"
-                )
-                confidence = (
-                    prediction.get("score", 0.0)
-                    if isinstance(prediction, dict)
-                    else 0.0
-                )
-
-                sentiments.append(sentiment)
-                confidences.append(confidence)
-
-                logger.info(f"Processed {idx + 1}/{len(df)} responses")
-
-            except Exception as e:
-                logger.warning(f"Error processing response {idx + 1}: {e}")
-                sentiments.append("ERROR")
-                confidences.append(0.0)
+        for idx, (sentiment, confidence) in zip(row_indices, predictions):
+            sentiments[idx] = sentiment
+            confidences[idx] = confidence
 
         # Update the dataframe
         df["Sentiment"] = sentiments
@@ -92,8 +152,10 @@ def analyze_sentiment():
 
         # Save results back to Excel
         output_file = "responses_with_sentiment.xlsx"
-        df.to_excel(output_file, index=False)
+        with timer.stage("export"):
+            df.to_excel(output_file, index=False)
         logger.info(f"Results saved to {output_file}")
+        logger.info(f"Stage timings (s): {timer.as_dict()}")
 
         # Display summary statistics
         sentiment_counts = df["Sentiment"].value_counts()
@@ -114,7 +176,16 @@ def analyze_sentiment():
 
 
 if __name__ == "__main__":
-    result = analyze_sentiment()
+    parser = argparse.ArgumentParser(description="Score responses.xlsx")
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        default=None,
+        help="Profile the run with cProfile (also enabled by SENTIMENT_PROFILE=1)",
+    )
+    args = parser.parse_args()
+
+    result = analyze_sentiment(profile=args.profile)
     if result is not None:
         print("\nSentiment analysis completed successfully!")
         print(f"Results saved to 'responses_with_sentiment.xlsx'")
@@ -0,0 +1,305 @@
+# Single-pass statistics over analyzed responses, shared by the app and scripts
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+HIGH_CONFIDENCE = 0.8
+MEDIUM_CONFIDENCE = 0.5
+HISTOGRAM_BINS = 20
+MAX_FLIERS = 200
+MAX_SCATTER_POINTS = 2000
+WHISKER_IQR = 1.5
+
+
+@dataclass
+class SentimentStats:
+    """Every insight and chart aggregate of one analyzed column"""
+
+    total: int
+    sentiment_counts: Dict[str, int]
+    confidence: Optional[Dict[str, float]] = None
+    confidence_levels: Optional[Dict[str, int]] = None
+    mean_confidence_by_sentiment: Dict[str, float] = field(default_factory=dict)
+    avg_response_length: Optional[float] = None
+    mean_length_by_sentiment: Dict[str, float] = field(default_factory=dict)
+    confidence_histogram: Optional[Dict[str, list]] = None
+    confidence_boxes: List[dict] = field(default_factory=list)
+    length_confidence: Optional[List[list]] = None
+
+    @property
+    def most_common_sentiment(self):
+        """(sentiment, count) of the largest group, or None when empty"""
+        if not self.sentiment_counts:
+            return None
+        return next(iter(self.sentiment_counts.items()))
+
+    def percentage(self, count):
+        return (count / self.total) * 100 if self.total else 0.0
+
+    def insights(self, column_name, columns=None):
+        """The insights dict rendered by the results pages and saved per run"""
+        insights = {
+            "total_responses": self.total,
+            "columns": list(columns or []),
+            "column_analyzed": column_name,
+            "sentiment_distribution": dict(self.sentiment_counts),
+        }
+
+        if self.most_common_sentiment:
+            sentiment, count = self.most_common_sentiment
+            insights["most_common_sentiment"] = {
+                "sentiment": sentiment,
+                "count": count,
+                "percentage": round(self.percentage(count), 1),
+            }
+
+        if self.confidence is not None:
+            insights["confidence_stats"] = {
+                key: round(value, 3) for key, value in self.confidence.items()
+            }
+            high = self.confidence_levels["high"]
+            insights["high_confidence"] = {
+                "count": high,
+                "percentage": round(self.percentage(high), 1),
+            }
+            if self.mean_confidence_by_sentiment:
+                sentiment, mean = _max_item(self.mean_confidence_by_sentiment)
+                insights["most_confident_sentiment"] = {
+                    "sentiment": sentiment,
+                    "avg_confidence": round(mean, 3),
+                }
+
+        if self.avg_response_length is not None:
+            insights["avg_response_length"] = round(self.avg_response_length, 0)
+            if self.mean_length_by_sentiment:
+                sentiment, mean = _max_item(self.mean_length_by_sentiment)
+                insights["longest_responses_sentiment"] = {
+                    "sentiment": sentiment,
+                    "avg_length": round(mean, 0),
+                }
+
+        return insights
+
+    def chart_aggregates(self):
+        """The JSON-serializable summaries the charts are drawn from"""
+        aggregates = {
+            "total": self.total,
+            "sentiment_counts": dict(self.sentiment_counts),
+        }
+        if self.confidence_histogram is not None:
+            aggregates["confidence_histogram"] = self.confidence_histogram
+            aggregates["confidence_boxes"] = self.confidence_boxes
+            aggregates["confidence_levels"] = self.confidence_levels
+        if self.length_confidence is not None:
+            aggregates["length_confidence"] = self.length_confidence
+        return aggregates
+
+
+def _max_item(values):
+    # First key wins ties, matching a stable descending sort
+    return max(values.items(), key=lambda item: item[1])
+
+
+def _box_stats(values, max_fliers):
+    """Box-plot statistics of sorted values, as matplotlib's ``bxp`` expects"""
+    q1, med, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    low = values[values >= q1 - WHISKER_IQR * iqr]
+    high = values[values <= q3 + WHISKER_IQR * iqr]
+    whislo = low[0] if len(low) else q1
+    whishi = high[-1] if len(high) else q3
+    fliers = values[(values < whislo) | (values > whishi)]
+    return {
+        "med": float(med),
+        "q1": float(q1),
+        "q3": float(q3),
+        "whislo": float(min(whislo, q1)),
+        "whishi": float(max(whishi, q3)),
+        "fliers": [float(v) for v in fliers[:max_fliers]],
+    }
+
+
+def compute_stats(
+    sentiments,
+    confidence=None,
+    lengths=None,
+    histogram_bins=HISTOGRAM_BINS,
+    max_fliers=MAX_FLIERS,
+    max_scatter_points=MAX_SCATTER_POINTS,
+):
+    """Compute all statistics from per-row arrays in one vectorized pass
+
+    ``sentiments`` holds one label per row; ``confidence`` and ``lengths``
+    (response length in characters) are optional arrays of the same length.
+    Sentiment groups are factorized once and every per-group figure is
+    derived from that coding with ``bincount`` and one sort.
+    """
+    codes, labels = pd.factorize(np.asarray(sentiments, dtype=object), sort=False)
+    labels = [str(label) for label in labels]
+    total = len(codes)
+    valid_codes = codes >= 0
+
+    counts = np.bincount(codes[valid_codes], minlength=len(labels))
+    # Descending by count; stable so ties keep first-appearance order
+    order = np.argsort(-counts, kind="stable")
+    stats = SentimentStats(
+        total=total,
+        sentiment_counts={labels[i]: int(counts[i]) for i in order if counts[i]},
+    )
+
+    if confidence is not None:
+        conf = pd.to_numeric(pd.Series(confidence), errors="coerce").to_numpy(
+            dtype=np.float64
+        )
+        has_conf = ~np.isnan(conf) & valid_codes
+        values = conf[has_conf]
+        value_codes = codes[has_conf]
+
+        if len(values):
+            stats.confidence = {
+                "mean": float(values.mean()),
+                "median": float(np.median(values)),
+                "min": float(values.min()),
+                "max": float(values.max()),
+                "std": float(values.std(ddof=1)) if len(values) > 1 else 0.0,
+            }
+        else:
+            stats.confidence = {k: 0.0 for k in ("mean", "median", "min", "max", "std")}
+
+        high = int((values >= HIGH_CONFIDENCE).sum())
+        low = int((values < MEDIUM_CONFIDENCE).sum())
+        stats.confidence_levels = {
+            "high": high,
+            "medium": len(values) - high - low,
+            "low": low,
+        }
+
+        group_sizes = np.bincount(value_codes, minlength=len(labels))
+        group_sums = np.bincount(value_codes, weights=values, minlength=len(labels))
+        stats.mean_confidence_by_sentiment = {
+            labels[i]: float(group_sums[i] / group_sizes[i])
+            for i in np.argsort(labels, kind="stable")
+            if group_sizes[i]
+        }
+
+        hist_counts, edges = np.histogram(values, bins=histogram_bins)
+        stats.confidence_histogram = {
+            "counts": hist_counts.tolist(),
+            "edges": [round(float(edge), 6) for edge in edges],
+        }
+
+        # One sort by (sentiment, confidence) gives every group's sorted slice
+        sort_idx = np.lexsort((values, value_codes))
+        sorted_values = values[sort_idx]
+        bounds = np.concatenate([[0], np.cumsum(group_sizes)])
+        for i, label in enumerate(labels):
+            group = sorted_values[bounds[i] : bounds[i + 1]]
+            if len(group):
+                stats.confidence_boxes.append(
+                    dict(label=label, **_box_stats(group, max_fliers))
+                )
+
+    if lengths is not None:
+        lengths = np.asarray(lengths, dtype=np.float64)
+        stats.avg_response_length = float(lengths.mean()) if total else 0.0
+
+        length_sums = np.bincount(
+            codes[valid_codes], weights=lengths[valid_codes], minlength=len(labels)
+        )
+        stats.mean_length_by_sentiment = {
+            labels[i]: float(length_sums[i] / counts[i])
+            for i in np.argsort(labels, kind="stable")
+            if counts[i]
+        }
+
+        if confidence is not None:
+            points = np.flatnonzero(has_conf)
+            if len(points) > max_scatter_points:
+                rng = np.random.default_rng(0)
+                points = np.sort(rng.choice(points, max_scatter_points, replace=False))
+            stats.length_confidence = [
+                [int(length), round(float(value), 4)]
+                for length, value in zip(lengths[points], conf[points])
+            ]
+
+    return stats
+
+
+def sentiment_columns(text_columns):
+    """(sentiment, confidence) output column names for each analyzed text column
+
+    A single column keeps the plain Sentiment/Confidence names; several get
+    ``<column>_Sentiment``/``<column>_Confidence`` pairs.
+    """
+    if len(text_columns) == 1:
+        return [("Sentiment", "Confidence")]
+    return [(f"{c}_Sentiment", f"{c}_Confidence") for c in text_columns]
+
+
+def present_responses(responses):
+    """Boolean mask of the responses that are scored: missing and
+    whitespace-only ones count as empty"""
+    return responses.notna() & (responses.astype(str).str.strip() != "")
+
+
+def response_lengths(responses):
+    """Length in characters of each response; missing responses count as 0"""
+    return responses.fillna("").astype(str).str.len().to_numpy()
+
+
+def _frame_arrays(df, text_column, sentiment_column, confidence_column):
+    lengths = None
+    if text_column is not None and text_column in df.columns:
+        lengths = response_lengths(df[text_column])
+    return (
+        (
+            df[sentiment_column].to_numpy()
+            if sentiment_column in df.columns
+            else np.array([])
+        ),
+        df[confidence_column].to_numpy() if confidence_column in df.columns else None,
+        lengths,
+    )
+
+
+def column_arrays(df, text_columns):
+    """(sentiments, confidence, lengths) arrays of each analyzed text column,
+    keyed by column"""
+    return {
+        column: _frame_arrays(df, column, *names)
+        for column, names in zip(text_columns, sentiment_columns(text_columns))
+    }
+
+
+def concat_arrays(arrays):
+    """Join (sentiments, confidence, lengths) tuples part by part; a part
+    missing from any tuple stays None"""
+    return tuple(
+        None if any(part is None for part in parts) else np.concatenate(parts)
+        for parts in zip(*arrays)
+    )
+
+
+def compute_frame_stats(df, text_column=None, **kwargs):
+    """Compute statistics from an analyzed DataFrame's Sentiment/Confidence columns
+
+    ``text_column`` may be a list of analyzed columns, whose output pairs
+    (see ``sentiment_columns``) are pooled into one set of statistics.
+    """
+    if not isinstance(text_column, (list, tuple)):
+        return compute_stats(
+            *_frame_arrays(df, text_column, "Sentiment", "Confidence"), **kwargs
+        )
+    return compute_stats(
+        *concat_arrays(column_arrays(df, text_column).values()), **kwargs
+    )
+
+
+def compute_column_stats(df, text_columns, **kwargs):
+    """Statistics of each analyzed text column, keyed by column"""
+    return {
+        column: compute_stats(*arrays, **kwargs)
+        for column, arrays in column_arrays(df, text_columns).items()
+    }
@@ -18,6 +18,25 @@ setup(
     long_description_content_type="text/markdown",
     url="https://github.com/sentiment-analyzer/app",
     packages=find_packages(),
+    # The application is a set of top-level modules
+    py_modules=[
+        "app",
+        "cli",
+        "database",
+        "excel_io",
+        "flags",
+        "inference",
+        "jobs",
+        "metrics",
+        "model_registry",
+        "onnx_backend",
+        "prediction_cache",
+        "profiling",
+        "result_store",
+        "row_store",
+        "sentiment_stats",
+        "timing",
+    ],
     classifiers=[
         "Development Status :: 4 - Beta",
         "Intended Audience :: End Users/Desktop",
@@ -35,10 +54,11 @@ setup(
     install_requires=requirements,
     extras_require={
         "dev": ["pyinstaller>=5.0", "pytest>=7.0"],
+        "onnx": ["onnx>=1.14.0", "onnxruntime>=1.15.0"],
     },
     entry_points={
         "console_scripts": [
-            "sentiment-analyzer=app:main",
+            "sentiment-analyzer=cli:main",
         ],
     },
     include_package_data=True,
@@ -0,0 +1,55 @@
+import pandas as pd
+
+from excel_io import build_columnar_cache, has_fresh_cache, read_excel_columns
+from inference import score_columns
+from row_store import row_hashes
+
+KEY_COLUMNS = ["Response ID", "Section"]
+
+
+def write_sheet(path):
+    pd.DataFrame(
+        {
+            "Response ID": range(1, 201),
+            "Section": [None if i % 7 == 0 else 10 + i % 3 for i in range(200)],
+            "Text": [None if i % 5 == 0 else f"response {i % 13}" for i in range(200)],
+        }
+    ).to_excel(path, index=False)
+
+
+def test_key_hashes_match_between_workbook_and_cache(tmp_path):
+    path = str(tmp_path / "survey.xlsx")
+    write_sheet(path)
+
+    from_workbook = read_excel_columns(path, ["Text"] + KEY_COLUMNS)
+    assert build_columnar_cache(path) and has_fresh_cache(path)
+    from_cache = read_excel_columns(path, ["Text"] + KEY_COLUMNS)
+
+    expected = row_hashes(from_workbook, "Text", KEY_COLUMNS)
+    assert row_hashes(from_cache, "Text", KEY_COLUMNS) == expected
+    assert sum(h is not None for h in expected) == 160
+
+
+def test_integer_columns_stay_integers_in_cache(tmp_path):
+    path = str(tmp_path / "survey.xlsx")
+    write_sheet(path)
+    build_columnar_cache(path)
+
+    df = read_excel_columns(path, ["Response ID"])
+    assert pd.api.types.is_integer_dtype(df["Response ID"])
+    assert df["Response ID"].tolist()[:3] == [1, 2, 3]
+
+
+def test_blank_responses_are_neither_scored_nor_hashed():
+    df = pd.DataFrame({"Text": ["good", "   ", None, "", "\t\n", "bad"]})
+    scored = []
+
+    def predict(texts):
+        scored.extend(texts)
+        return [("positive", 0.9)] * len(texts)
+
+    assert score_columns(df, ["Text"], predict) == 2
+    assert scored == ["good", "bad"]
+    assert df["Sentiment"].tolist() == ["positive"] + ["UNKNOWN"] * 4 + ["positive"]
+    hashes = row_hashes(df, "Text")
+    assert [h is not None for h in hashes] == [True] + [False] * 4 + [True]
@@ -0,0 +1,32 @@
+# Wall-clock timing of the named stages of an analysis
+import time
+from contextlib import contextmanager
+
+
+class StageTimer:
+    """Accumulates elapsed seconds per named stage, in first-use order.
+
+    Use ``with timer.stage("inference"):`` around each stage; entering the
+    same stage again adds to its total.
+    """
+
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    @property
+    def total(self):
+        return sum(self.stages.values())
+
+    def as_dict(self, digits=4):
+        return {name: round(seconds, digits) for name, seconds in self.stages.items()}